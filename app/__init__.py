@@ -0,0 +1,9 @@
+# app/__init__.py
+from pathlib import Path
+
+from dotenv import load_dotenv, find_dotenv
+
+# --- Load .env once for the whole package (works from OneDrive, nested folders, etc.) ---
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DOTENV_PATH = find_dotenv(usecwd=True) or str(PROJECT_ROOT / ".env")
+load_dotenv(dotenv_path=DOTENV_PATH, override=False)
@@ -0,0 +1,42 @@
+# app/_cookies.py
+"""Session cookie settings shared by the UI, JSON auth, and SSO routes."""
+import os
+from typing import Any, Dict
+
+from fastapi import Request, Response
+
+SESSION_COOKIE = os.getenv("SESSION_COOKIE_NAME", "session")
+COOKIE_SECURE_MODE = os.getenv("COOKIE_SECURE", "auto").lower()  # "auto" | "true" | "false"
+COOKIE_SAMESITE = os.getenv("COOKIE_SAMESITE", "lax").lower()   # "lax" | "strict" | "none"
+
+
+def _is_secure_request(request: Request) -> bool:
+    xf = (request.headers.get("x-forwarded-proto") or "").lower()
+    if xf:
+        return "https" in xf
+    return request.url.scheme == "https"
+
+
+def _cookie_kwargs(request: Request) -> Dict[str, Any]:
+    if COOKIE_SECURE_MODE in ("true", "1", "yes"):
+        secure = True
+    elif COOKIE_SECURE_MODE in ("false", "0", "no"):
+        secure = False
+    else:
+        secure = _is_secure_request(request)
+
+    samesite = COOKIE_SAMESITE if COOKIE_SAMESITE in ("lax", "strict", "none") else "lax"
+    if samesite == "none" and not secure:
+        secure = True
+
+    return {
+        "httponly": True,
+        "secure": secure,
+        "samesite": samesite,
+        "max_age": 60 * 60 * 24 * 7,  # 7 days
+        "path": "/",
+    }
+
+
+def _set_session_cookie(resp: Response, request: Request, token: str) -> None:
+    resp.set_cookie(SESSION_COOKIE, token, **_cookie_kwargs(request))
@@ -5,27 +5,33 @@ import os
 from typing import Any, Dict, List, Optional
 
 import pandas as pd
-from fastapi import APIRouter, Depends, HTTPException, Request, Body
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Body
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 
-from . import store
+from . import cache, mailer, store
 from .deps import require_user
-from .guardian import score_risk
-from .compliance import tag_category
+from .guardian import score_risk_df
+from .llm import clear_llm_cache
+from .compliance import tag_category_df
 from .security import rotate_api_key, preview_api_key
+from .settings import get_settings
 
 # ---------- Email (SendGrid) ----------
 SENDGRID_KEY = os.getenv("SENDGRID_API_KEY", "").strip()
 ALERT_FROM   = os.getenv("ALERT_EMAIL_FROM", "").strip()
 DEFAULT_TO   = os.getenv("ALERT_EMAIL_TO", "").strip()
+RISK_THRESHOLD = get_settings().risk_threshold
 
 BASE_DIR = os.path.dirname(__file__)
 templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
+_VALID_ROLES = frozenset({"admin", "analyst", "viewer"})
+
 # ---------- Auth helpers ----------
 def require_admin(user=Depends(require_user)):
     """Allow only role=admin."""
@@ -34,36 +40,18 @@ def require_admin(user=Depends(require_user)):
     return user
 
 # ---------- Utils ----------
-def _row_score(r: Dict[str, Any]) -> float:
-    """NaN-safe getter for risk score."""
-    try:
-        val = r.get("score", None)
-        if val is None or (isinstance(val, float) and pd.isna(val)):
-            val = r.get("risk_score", 0)
-        if isinstance(val, float) and pd.isna(val):
-            val = 0
-        return float(val or 0)
-    except Exception:
-        return 0.0
-
-def _send_email(subject: str, text: str, to_email: Optional[str] = None) -> Dict[str, Any]:
-    """Lightweight SendGrid helper used only in admin routes."""
+def _email_recipient(to_email: Optional[str]) -> Optional[str]:
     recipient = (to_email or DEFAULT_TO).strip()
-    if not (SENDGRID_KEY and ALERT_FROM and recipient):
+    return recipient if (SENDGRID_KEY and ALERT_FROM and recipient) else None
+
+async def _send_email(subject: str, text: str, to_email: Optional[str] = None) -> Dict[str, Any]:
+    """Admin test mail via mailer's shared async client (closed in the app lifespan)."""
+    recipient = _email_recipient(to_email)
+    if not recipient:
         return {"sent": False, "reason": "missing SENDGRID_API_KEY/ALERT_EMAIL_FROM/ALERT_EMAIL_TO"}
     try:
-        from sendgrid import SendGridAPIClient
-        from sendgrid.helpers.mail import Mail, Email, To, Content
-        msg = Mail(
-            from_email=Email(ALERT_FROM),
-            to_emails=To(recipient),
-            subject=subject,
-            plain_text_content=Content("text/plain", text),
-        )
-        sg = SendGridAPIClient(SENDGRID_KEY)
-        resp = sg.send(msg)
-        ok = 200 <= resp.status_code < 300
-        return {"sent": ok, "status_code": resp.status_code, "to": recipient}
+        status = await mailer.send_email_async(recipient, subject, text, from_email=ALERT_FROM)
+        return {"sent": 200 <= status < 300, "status_code": status, "to": recipient}
     except Exception as e:
         return {"sent": False, "error": str(e)}
 
@@ -73,169 +61,235 @@ def admin_home(request: Request, user=Depends(require_admin)):
     return templates.TemplateResponse("admin.html", {"request": request, "title": "Admin"})
 
 # ---------- Stats ----------
-@router.get("/api/stats")
-def admin_stats(user=Depends(require_admin)):
-    rows = store.list_all(limit=100000)
-    total = len(rows)
-    threshold = float(os.getenv("RISK_THRESHOLD", "0.75") or 0.75)
-    alerts = [r for r in rows if _row_score(r) >= threshold]
-    avg_risk = round(sum(_row_score(r) for r in rows) / total, 3) if total else 0.0
-    cats: Dict[str, int] = {}
-    for r in rows:
-        c = r.get("category") or "unknown"
-        cats[c] = cats.get(c, 0) + 1
+STATS_CACHE_PREFIX = "admin:stats:"
+STATS_CACHE_TTL = 15  # seconds; admin UI polls this
 
+@router.get("/api/stats")
+async def admin_stats(user=Depends(require_admin)):
+    threshold = RISK_THRESHOLD
+    key = f"{STATS_CACHE_PREFIX}{threshold}"
+    cached = await cache.get_json(key)
+    if cached is not None:
+        return cached
+
+    agg = await run_in_threadpool(store.stats, threshold)
     backend = "postgres" if getattr(store, "USING_POSTGRES", False) else "sqlite"
-    return {
+    result = {
         "backend": backend,
         "db_path": getattr(store, "DB_PATH", None),
-        "total": total,
-        "alerts": len(alerts),
-        "avg_risk": avg_risk,
+        "total": agg["total"],
+        "alerts": agg["alerts"],
+        "avg_risk": round(agg["avg_risk"], 3),
         "threshold": threshold,
-        "categories": cats,
+        "categories": agg["categories"],
         "server_time": pd.Timestamp.utcnow().isoformat(),
     }
+    await cache.set_json(key, result, STATS_CACHE_TTL)
+    return result
 
 # ---------- Users ----------
-def _list_users() -> List[Dict[str, Any]]:
-    con = store._conn()
-    cur = con.cursor()
-    cur.execute("""
-        SELECT id, email, password_hash, role, subscription_active, created_at
-        FROM users
-        ORDER BY created_at DESC
-    """)
-    rows = cur.fetchall()
-    con.close()
+USERS_CACHE_PREFIX = "admin:users:"
+USERS_CACHE_TTL = 30  # seconds
+
+def _list_users(limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+    p = store._ph()
+    with store.connection() as con:
+        cur = con.cursor()
+        # password_hash is never selected, so it can't leak into the response
+        cur.execute(f"""
+            SELECT id, email, role, subscription_active, created_at
+            FROM users
+            ORDER BY created_at DESC, id DESC
+            LIMIT {p} OFFSET {p}
+        """, (limit, offset))
+        rows = cur.fetchall()
 
     out: List[Dict[str, Any]] = []
     for r in rows:
-        if isinstance(r, dict):
-            d = dict(r)
-        elif hasattr(r, "keys"):
-            d = {k: r[k] for k in r.keys()}
-        else:
-            # Fallback to positional tuple order
-            id_, email, password_hash, role, sub_active, created_at = r
-            d = {
-                "id": id_, "email": email, "password_hash": password_hash,
-                "role": role, "subscription_active": sub_active, "created_at": created_at,
-            }
+        d = dict(r)
         d["subscription_active"] = bool(d.get("subscription_active"))
-        d.pop("password_hash", None)  # never expose hashes
         out.append(d)
     return out
 
 @router.get("/api/users")
-def admin_users(user=Depends(require_admin)):
-    return {"items": _list_users()}
+async def admin_users(limit: int = 100, offset: int = 0, user=Depends(require_admin)):
+    limit = max(1, min(int(limit), 1000))
+    offset = max(0, int(offset))
+    key = f"{USERS_CACHE_PREFIX}{limit}:{offset}"
+    cached = await cache.get_json(key)
+    if cached is not None:
+        return cached
+
+    result = {"items": await run_in_threadpool(_list_users, limit, offset), "limit": limit, "offset": offset}
+    await cache.set_json(key, result, USERS_CACHE_TTL)
+    return result
 
 class UpdateRolePayload(BaseModel):
     role: str
 
+    @field_validator("role")
+    @classmethod
+    def _norm_role(cls, v: str) -> str:
+        return (v or "").lower().strip()
+
 class UpdateSubPayload(BaseModel):
     active: bool
 
 @router.post("/api/users/{user_id}/role")
-def admin_set_role(user_id: int, payload: UpdateRolePayload, user=Depends(require_admin)):
-    u = store.get_user_by_id(user_id)
+async def admin_set_role(user_id: int, payload: UpdateRolePayload, user=Depends(require_admin)):
+    u = await run_in_threadpool(store.get_user_by_id, user_id)
     if not u:
         raise HTTPException(status_code=404, detail="User not found")
-    role = (payload.role or "").lower().strip()
-    if role not in {"admin", "analyst", "viewer"}:
+    role = payload.role
+    if role not in _VALID_ROLES:
         raise HTTPException(status_code=400, detail="Invalid role")
-    store.set_role(u["email"], role)
-    return {"ok": True, "user": store.get_user_by_id(user_id)}
+    await run_in_threadpool(store.set_role, u["email"], role)
+    await cache.delete_prefix(USERS_CACHE_PREFIX)
+    u["role"] = role
+    u.pop("password_hash", None)
+    return {"ok": True, "user": u}
 
 @router.post("/api/users/{user_id}/subscription")
-def admin_set_subscription(user_id: int, payload: UpdateSubPayload, user=Depends(require_admin)):
-    u = store.get_user_by_id(user_id)
+async def admin_set_subscription(user_id: int, payload: UpdateSubPayload, user=Depends(require_admin)):
+    u = await run_in_threadpool(store.get_user_by_id, user_id)
     if not u:
         raise HTTPException(status_code=404, detail="User not found")
-    store.set_subscription_active(u["email"], bool(payload.active))
-    return {"ok": True, "user": store.get_user_by_id(user_id)}
+    await run_in_threadpool(store.set_subscription_active, u["email"], bool(payload.active))
+    await cache.delete_prefix(USERS_CACHE_PREFIX)
+    u["subscription_active"] = bool(payload.active)
+    u.pop("password_hash", None)
+    return {"ok": True, "user": u}
 
 # ---------- Data tools ----------
+SEED_BATCH_SIZE = 10_000  # rows per CSV chunk / executemany commit
+
 class SeedDemoPayload(BaseModel):
     limit: Optional[int] = None  # rows to import from sample
 
+# Only the columns seeding uses, with explicit dtypes (low-cardinality strings as category)
+SEED_DTYPES: Dict[str, str] = {
+    "tx_id": "string", "chain": "category", "symbol": "category", "direction": "category",
+    "from_addr": "string", "to_addr": "string", "memo": "string", "notes": "string",
+    "category": "string",
+}
+# read loosely and coerced per chunk: a strict float dtype fails the whole seed on one bad cell
+SEED_NUMERIC = ("amount", "fee")
+SEED_DEFAULTS: Dict[str, Any] = {
+    "tx_id": "", "chain": "XRPL", "from_addr": "", "to_addr": "", "symbol": "XRP",
+    "direction": "out", "memo": "", "notes": "", "amount": 0.0, "fee": 0.0,
+}
+
+def _fill(s: pd.Series, default: Any) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype) and default not in s.cat.categories:
+        s = s.cat.add_categories([default])
+    return s.fillna(default)
+
+def _seed_chunk(df: pd.DataFrame) -> int:
+    if "timestamp" in df.columns:
+        # parse_dates leaves the column as object if any value is malformed
+        ts = pd.to_datetime(df["timestamp"], errors="coerce")
+        # NaT -> None (NULL), not the 'nan' strftime would give
+        df["timestamp"] = ts.dt.strftime("%Y-%m-%dT%H:%M:%S").astype(object).where(ts.notna(), None)
+    else:
+        df["timestamp"] = None
+    for col in SEED_NUMERIC:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    for col, default in SEED_DEFAULTS.items():
+        df[col] = _fill(df[col], default) if col in df.columns else default
+
+    # Score + categorize the whole frame at once instead of per row
+    df["risk_score"], df["risk_flags"] = score_risk_df(df)
+    auto_cat = tag_category_df(df)
+    if "category" in df.columns:
+        given = df["category"].fillna("").astype(str)
+        df["category"] = given.where(given != "", auto_cat)
+    else:
+        df["category"] = auto_cat
+
+    cols = [
+        "tx_id", "timestamp", "chain", "from_addr", "to_addr", "amount", "symbol",
+        "direction", "memo", "fee", "category", "notes", "risk_score", "risk_flags",
+    ]
+    return store.save_tagged_many(df[cols].to_dict(orient="records"))
+
+def _seed_demo(data_path: str, limit: Optional[int]) -> int:
+    """Stream the CSV in SEED_BATCH_SIZE chunks so memory stays flat for big files."""
+    saved = 0
+    has_ts = "timestamp" in pd.read_csv(data_path, nrows=0).columns
+    with pd.read_csv(
+        data_path,
+        usecols=lambda c: c in SEED_DTYPES or c in SEED_NUMERIC or c == "timestamp",
+        dtype=SEED_DTYPES,
+        parse_dates=["timestamp"] if has_ts else None,
+        chunksize=SEED_BATCH_SIZE,
+        nrows=int(limit) if limit else None,
+    ) as reader:
+        for chunk in reader:
+            saved += _seed_chunk(chunk)
+    return saved
+
 @router.post("/api/data/seed_demo")
-def admin_seed_demo(payload: SeedDemoPayload = Body(default=None), user=Depends(require_admin)):
+async def admin_seed_demo(payload: SeedDemoPayload = Body(default=None), user=Depends(require_admin)):
     data_path = os.path.join(BASE_DIR, "..", "data", "sample_transactions.csv")
     if not os.path.exists(data_path):
         raise HTTPException(status_code=404, detail="sample_transactions.csv not found")
 
-    df = pd.read_csv(data_path)
-    if payload and payload.limit:
-        df = df.head(int(payload.limit))
-
-    if "timestamp" in df.columns:
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce").dt.strftime("%Y-%m-%dT%H:%M:%S")
-    for col in ("memo", "notes", "symbol", "direction", "chain", "tx_id", "from_addr", "to_addr"):
-        if col in df.columns:
-            df[col] = df[col].fillna("").astype(str)
-    for col in ("amount", "fee"):
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0)
-
-    saved = 0
-    for _, row in df.iterrows():
-        tx = {
-            "tx_id": row.get("tx_id"),
-            "timestamp": row.get("timestamp"),
-            "chain": row.get("chain") or "XRPL",
-            "from_addr": row.get("from_addr") or "",
-            "to_addr": row.get("to_addr") or "",
-            "amount": float(row.get("amount") or 0),
-            "symbol": row.get("symbol") or "XRP",
-            "direction": row.get("direction") or "out",
-            "memo": row.get("memo") or "",
-            "fee": float(row.get("fee") or 0),
-            "category": row.get("category") or None,
-            "notes": row.get("notes") or "",
-        }
-        risk, flags = score_risk(tx)
-        cat = tx.get("category") or tag_category(tx)
-        d = {**tx, "risk_score": risk, "risk_flags": flags, "category": cat}
-        store.save_tagged(d)
-        saved += 1
-
+    saved = await run_in_threadpool(_seed_demo, data_path, payload.limit if payload else None)
+    await cache.delete_prefix(STATS_CACHE_PREFIX)
     return {"ok": True, "saved": saved}
 
 class PurgePayload(BaseModel):
     confirm: str
 
+def _purge_txs() -> None:
+    with store.connection() as con:
+        con.cursor().execute("DELETE FROM txs")
+        con.commit()
+        if not store.USING_POSTGRES:
+            # give the freed pages back to the filesystem (must run outside a transaction)
+            con.execute("VACUUM")
+
 @router.post("/api/data/purge")
-def admin_purge(payload: PurgePayload, user=Depends(require_admin)):
+async def admin_purge(payload: PurgePayload, user=Depends(require_admin)):
     if (payload.confirm or "").upper() != "DELETE":
         raise HTTPException(status_code=400, detail='Type "DELETE" to confirm')
-    con = store._conn()
-    cur = con.cursor()
-    cur.execute("DELETE FROM txs")
-    con.commit()
-    con.close()
+    await run_in_threadpool(_purge_txs)
+    await cache.delete_prefix(STATS_CACHE_PREFIX)
     return {"ok": True, "deleted": True}
 
+@router.post("/api/cache/clear")
+async def admin_cache_clear(user=Depends(require_admin)):
+    # cached scores/categories go stale when the scoring rules or keywords change,
+    # cached LLM answers when the prompts or model do
+    cleared = len(cache.SCORE_CACHE)
+    cache.SCORE_CACHE.clear()
+    clear_llm_cache()
+    await cache.delete_prefix(STATS_CACHE_PREFIX)
+    return {"ok": True, "cleared": cleared}
+
 # ---------- Utilities ----------
 class TestEmailPayload(BaseModel):
     email: Optional[str] = None
 
 @router.post("/api/email/test")
-def admin_email_test(payload: TestEmailPayload = Body(default=None), user=Depends(require_admin)):
+async def admin_email_test(bg: BackgroundTasks, payload: TestEmailPayload = Body(default=None), user=Depends(require_admin)):
     to_addr = payload.email if payload and payload.email else DEFAULT_TO
-    res = _send_email("Klerno Admin Test", "✅ Admin test email from Klerno.", to_addr)
-    return {"ok": bool(res.get("sent")), "result": res}
+    if not _email_recipient(to_addr):
+        return {"ok": False, "result": {"sent": False, "reason": "missing SENDGRID_API_KEY/ALERT_EMAIL_FROM/ALERT_EMAIL_TO"}}
+    # Respond right away; the SendGrid round-trip happens after the response is sent.
+    bg.add_task(_send_email, "Klerno Admin Test", "✅ Admin test email from Klerno.", to_addr)
+    return {"ok": True, "queued": True}
 
 class XRPLPingPayload(BaseModel):
     account: str
     limit: Optional[int] = 1
 
 @router.post("/api/xrpl/ping")
-def admin_xrpl_ping(payload: XRPLPingPayload, user=Depends(require_admin)):
-    from .integrations.xrp import fetch_account_tx
+async def admin_xrpl_ping(payload: XRPLPingPayload, user=Depends(require_admin)):
+    from .integrations.xrp import fetch_account_tx_async
     try:
-        raw = fetch_account_tx(payload.account, limit=int(payload.limit or 1))
+        raw = await fetch_account_tx_async(payload.account, limit=int(payload.limit or 1))
         n = len(raw or [])
         return {"ok": True, "fetched": n}
     except Exception as e:
@@ -4,16 +4,22 @@ Safe Auto-Improver (proposal-only).
 from __future__ import annotations
 
 import difflib
+import os
 import sys
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Tuple
 from datetime import datetime, timezone
 
 import yaml
 
 ROOT = Path(__file__).resolve().parents[1]
+_FUTURE_IMPORT = "from __future__ import annotations"
+_HEADER_BYTES = 2048  # shebang/encoding/docstring + where the import normally sits
+_SKIP_DIRS = frozenset({"__pycache__", ".venv", "venv", ".git", "node_modules"})
 
 @dataclass
 class Suggestion:
@@ -22,7 +28,7 @@ class Suggestion:
     after: str
     rationale: str
 
-def load_policy() -> Dict[str, Any]:
+def _read_policy() -> Dict[str, Any]:
     p = ROOT / "automation" / "policy.yaml"
     if not p.exists():
         # No policy? Act as "deny all" to be safe.
@@ -34,6 +40,16 @@ def load_policy() -> Dict[str, Any]:
         print(f"[policy] Failed to load policy.yaml: {e}")
         return {"allowed_paths": []}
 
+@lru_cache(maxsize=1)
+def _policy_and_bases() -> Tuple[Dict[str, Any], Tuple[Path, ...]]:
+    """Parse policy.yaml once and resolve its allowed paths under the repo root."""
+    policy = _read_policy()
+    bases = tuple((ROOT / a).resolve() for a in (policy.get("allowed_paths", []) or []))
+    return policy, bases
+
+def load_policy() -> Dict[str, Any]:
+    return _policy_and_bases()[0]
+
 def _insert_future_annotations(content: str) -> str:
     """
     Insert 'from __future__ import annotations' at a safe position:
@@ -89,12 +105,10 @@ def llm_suggest(file_path: Path, content: str) -> List[Suggestion]:
 
     return suggestions
 
-def bounded_change_allowed(policy: Dict[str, Any], abs_path: Path) -> bool:
-    allowed = policy.get("allowed_paths", []) or []
-    # Convert allowed entries to absolute paths under the repo root
-    allowed_dirs = [(ROOT / a).resolve() for a in allowed]
+def bounded_change_allowed(bases: Tuple[Path, ...], abs_path: Path) -> bool:
+    """`bases` are the resolved allowed paths from _policy_and_bases()."""
     abs_path = abs_path.resolve()
-    for base in allowed_dirs:
+    for base in bases:
         try:
             if abs_path.is_relative_to(base):
                 return True
@@ -117,34 +131,64 @@ def make_patch(before: str, after: str, file_label: str) -> str:
     )
     return "".join(diff)
 
+def _iter_py(root: Path) -> Iterator[Path]:
+    """Lazily yield *.py files under root, pruning cache/vendor dirs before descending."""
+    stack = [str(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in _SKIP_DIRS:
+                        stack.append(entry.path)
+                elif entry.name.endswith(".py") and entry.is_file():
+                    yield Path(entry.path)
+
+def _process_one(path: Path) -> List[Tuple[str, str, str]]:
+    """Read + suggest for one file in a worker; returns (file, rationale, patch) triples."""
+    # Most files already have the import near the top; peek before reading it all.
+    with path.open("rb") as f:
+        head = f.read(_HEADER_BYTES).decode("utf-8", "ignore")
+    if _FUTURE_IMPORT in head:
+        return []
+    content = path.read_text(encoding="utf-8")
+    return [
+        (sug.file, sug.rationale, make_patch(sug.before, sug.after, sug.file))
+        for sug in llm_suggest(path, content)
+    ]
+
 def propose_changes() -> None:
-    policy = load_policy()
+    _, bases = _policy_and_bases()
     proposals_dir = ROOT / "automation" / "proposals"
     patches_dir = ROOT / "automation" / "patches"
     proposals_dir.mkdir(parents=True, exist_ok=True)
     patches_dir.mkdir(parents=True, exist_ok=True)
 
-    for p in (ROOT / "app").rglob("*.py"):
-        if not bounded_change_allowed(policy, p):
-            continue
-
-        content = p.read_text(encoding="utf-8")
-        for sug in llm_suggest(p, content):
-            patch = make_patch(sug.before, sug.after, sug.file)
-            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
-            uid = uuid.uuid4().hex[:8]
-            proposals_path = proposals_dir / f"proposal_{stamp}_{uid}_{p.stem}.md"
-            patches_path = patches_dir / f"patch_{stamp}_{uid}_{p.stem}.patch"
-
-            proposals_path.write_text(
-                f"# Improvement Proposal\n\n"
-                f"**File:** `{sug.file}`\n\n"
-                f"**Rationale:** {sug.rationale}\n\n"
-                f"**How to apply:**\n"
-                f"```bash\ngit apply automation/patches/{patches_path.name}\n```\n",
-                encoding="utf-8",
-            )
-            patches_path.write_text(patch, encoding="utf-8")
+    paths = [p for p in _iter_py(ROOT / "app") if bounded_change_allowed(bases, p)]
+    if not paths:
+        return
+
+    # Scanning is parallel; writing stays here so names can't collide across workers.
+    with ProcessPoolExecutor() as ex:
+        for p, results in zip(paths, ex.map(_process_one, paths, chunksize=8)):
+            for file_label, rationale, patch in results:
+                stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+                uid = uuid.uuid4().hex[:8]
+                proposals_path = proposals_dir / f"proposal_{stamp}_{uid}_{p.stem}.md"
+                patches_path = patches_dir / f"patch_{stamp}_{uid}_{p.stem}.patch"
+
+                proposals_path.write_text(
+                    f"# Improvement Proposal\n\n"
+                    f"**File:** `{file_label}`\n\n"
+                    f"**Rationale:** {rationale}\n\n"
+                    f"**How to apply:**\n"
+                    f"```bash\ngit apply automation/patches/{patches_path.name}\n```\n",
+                    encoding="utf-8",
+                )
+                patches_path.write_text(patch, encoding="utf-8")
 
 if __name__ == "__main__":
     propose_changes()
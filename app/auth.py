@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Response, Depends, HTTPException
-from pydantic import BaseModel, EmailStr
+from typing import Annotated
+
+import anyio
+from fastapi import APIRouter, Request, Response, Depends, HTTPException
+from pydantic import AfterValidator, BaseModel, EmailStr
 
 from . import store
+from ._cookies import SESSION_COOKIE, _set_session_cookie
 from .security_session import hash_pw, verify_pw, issue_jwt
 from .deps import require_user
 from .settings import get_settings, Settings
@@ -12,12 +16,15 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 S: Settings = get_settings()
 
 # ---------- Schemas ----------
+# Normalized once at validation time; handlers use payload.email as-is.
+EmailLower = Annotated[EmailStr, AfterValidator(lambda e: e.lower().strip())]
+
 class SignupReq(BaseModel):
-    email: EmailStr
+    email: EmailLower
     password: str
 
 class LoginReq(BaseModel):
-    email: EmailStr
+    email: EmailLower
     password: str
 
 class UserOut(BaseModel):
@@ -29,62 +36,57 @@ class AuthResponse(BaseModel):
     ok: bool
     user: UserOut
 
-# ---------- Helpers ----------
-def _set_session_cookie(res: Response, token: str) -> None:
-    """Set the session cookie with sane defaults."""
-    res.set_cookie(
-        key="session",
-        value=token,
-        httponly=True,
-        secure=(S.app_env != "dev"),   # HTTPS in staging/prod
-        samesite="lax",                # use "none" if cross-site SPA
-        max_age=60 * 60 * 24 * 7,      # 7 days
-        path="/",
-    )
-
 # ---------- Routes ----------
 @router.post("/signup", response_model=AuthResponse, status_code=201)
-def signup(payload: SignupReq, res: Response):
-    email = payload.email.lower().strip()
-
-    if store.get_user_by_email(email):
+async def signup(payload: SignupReq, request: Request, res: Response):
+    email = payload.email
+
+    # bootstrap: ENV admin (or, below, the very first user) becomes admin + active subscription
+    is_admin = email == S.admin_email
+    role, sub_active = ("admin", True) if is_admin else ("viewer", False)
+
+    # hashing is CPU-bound; keep it off the event loop
+    password_hash = await anyio.to_thread.run_sync(hash_pw, payload.password)
+    # single INSERT ... ON CONFLICT(email) DO NOTHING; None means the email is taken
+    user = await anyio.to_thread.run_sync(
+        lambda: store.create_user(
+            email=email,
+            password_hash=password_hash,
+            role=role,
+            subscription_active=sub_active,
+        )
+    )
+    if user is None:
         # Avoid leaking too much; 409 is the conventional code here
         raise HTTPException(status_code=409, detail="User already exists")
 
-    # bootstrap: first user or ENV admin becomes admin + active subscription
-    role = "viewer"
-    sub_active = False
-    if email == S.admin_email or store.users_count() == 0:
-        role, sub_active = "admin", True
-
-    user = store.create_user(
-        email=email,
-        password_hash=hash_pw(payload.password),
-        role=role,
-        subscription_active=sub_active,
-    )
+    if not is_admin and await anyio.to_thread.run_sync(store.users_count) == 1:
+        await anyio.to_thread.run_sync(store.set_role, email, "admin")
+        await anyio.to_thread.run_sync(store.set_subscription_active, email, True)
+        user = {**user, "role": "admin", "subscription_active": True}
+
     token = issue_jwt(user["id"], user["email"], user["role"])
-    _set_session_cookie(res, token)
+    _set_session_cookie(res, request, token)
 
     return {"ok": True, "user": {"email": user["email"], "role": user["role"], "subscription_active": user["subscription_active"]}}
 
 @router.post("/login", response_model=AuthResponse)
-def login(payload: LoginReq, res: Response):
-    email = payload.email.lower().strip()
-    user = store.get_user_by_email(email)
+async def login(payload: LoginReq, request: Request, res: Response):
+    email = payload.email
+    user = await anyio.to_thread.run_sync(store.get_user_by_email, email)
 
-    if not user or not verify_pw(payload.password, user["password_hash"]):
+    if not user or not await anyio.to_thread.run_sync(verify_pw, payload.password, user["password_hash"]):
         # Generic message prevents user enumeration
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token = issue_jwt(user["id"], user["email"], user["role"])
-    _set_session_cookie(res, token)
+    _set_session_cookie(res, request, token)
 
     return {"ok": True, "user": {"email": user["email"], "role": user["role"], "subscription_active": user["subscription_active"]}}
 
 @router.post("/logout", status_code=204)
 def logout(res: Response, user=Depends(require_user)):
-    res.delete_cookie("session", path="/")
+    res.delete_cookie(SESSION_COOKIE, path="/")
     # 204 No Content
     return Response(status_code=204)
 
@@ -4,6 +4,7 @@ from fastapi.responses import RedirectResponse
 from authlib.integrations.starlette_client import OAuth
 import os
 from . import store
+from ._cookies import _set_session_cookie
 from .security_session import issue_jwt
 
 router = APIRouter(tags=["auth:sso"])
@@ -24,10 +25,6 @@ oauth.register(
     client_kwargs={"scope": "openid email profile"},
 )
 
-def _set_cookie(resp: RedirectResponse, request: Request, jwt: str):
-    from .main import _cookie_kwargs, SESSION_COOKIE
-    resp.set_cookie(SESSION_COOKIE, jwt, **_cookie_kwargs(request))
-
 @router.get("/login/google")
 async def login_google(request: Request):
     return await oauth.google.authorize_redirect(request, request.url_for("auth_google_cb"))
@@ -40,7 +37,7 @@ async def auth_google_cb(request: Request):
     if not email: return RedirectResponse("/login?error=google")
     user = store.get_user_by_email(email) or store.create_user(email, password_hash="", role="viewer", subscription_active=True)
     jwt = issue_jwt(user["id"], user["email"], user["role"])
-    resp = RedirectResponse("/dashboard", status_code=303); _set_cookie(resp, request, jwt); return resp
+    resp = RedirectResponse("/dashboard", status_code=303); _set_session_cookie(resp, request, jwt); return resp
 
 @router.get("/login/microsoft")
 async def login_ms(request: Request):
@@ -54,4 +51,4 @@ async def auth_ms_cb(request: Request):
     if not email: return RedirectResponse("/login?error=microsoft")
     user = store.get_user_by_email(email) or store.create_user(email, password_hash="", role="viewer", subscription_active=True)
     jwt = issue_jwt(user["id"], user["email"], user["role"])
-    resp = RedirectResponse("/dashboard", status_code=303); _set_cookie(resp, request, jwt); return resp
+    resp = RedirectResponse("/dashboard", status_code=303); _set_session_cookie(resp, request, jwt); return resp
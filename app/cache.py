@@ -0,0 +1,129 @@
+# app/cache.py
+"""
+Small caches shared across the app.
+
+- get_json/set_json/delete_prefix: async JSON response cache for read-heavy
+  endpoints. Uses Redis (redis.asyncio) when REDIS_URL is set and the client
+  library is installed; otherwise falls back to a bounded in-process TTLCache so
+  local/dev runs behave the same way without extra services.
+- TTLCache: thread-safe in-process cache for hot lookups (users, tokens, ...).
+- SCORE_CACHE: (risk, flags, category) per scoring input, filled by the
+  tagging paths in main.py and cleared from the admin API.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# redis might not be installed locally; handle gracefully
+try:
+    import redis.asyncio as aioredis  # type: ignore[import-not-found]
+    REDIS_AVAILABLE = True
+except Exception:
+    REDIS_AVAILABLE = False
+
+@lru_cache
+def get_redis():
+    """Shared Redis client, or None when Redis isn't configured/available."""
+    url = os.getenv("REDIS_URL", "").strip()
+    if not (url and REDIS_AVAILABLE):
+        return None
+    return aioredis.from_url(url, decode_responses=True)
+
+
+async def get_json(key: str) -> Optional[Any]:
+    client = get_redis()
+    if client is not None:
+        try:
+            raw = await client.get(key)
+        except Exception:
+            raw = None
+    else:
+        raw = _LOCAL.get(key)
+    return json.loads(raw) if raw else None
+
+
+async def set_json(key: str, value: Any, ttl: int) -> None:
+    raw = json.dumps(value, default=str)
+    client = get_redis()
+    if client is not None:
+        try:
+            await client.setex(key, ttl, raw)
+        except Exception:
+            pass
+        return
+    _LOCAL.set(key, raw, ttl)
+
+
+async def delete_prefix(prefix: str) -> None:
+    """Drop every cached key starting with `prefix` (SCAN, never KEYS)."""
+    client = get_redis()
+    if client is not None:
+        try:
+            keys = [k async for k in client.scan_iter(match=f"{prefix}*")]
+            if keys:
+                await client.delete(*keys)
+        except Exception:
+            pass
+        return
+    _LOCAL.discard_where(lambda k, _v: k.startswith(prefix))
+
+
+class TTLCache:
+    """
+    Minimal thread-safe TTL + size-bounded mapping (oldest entry evicted first).
+    Keeps us off an extra dependency for the few hot lookups that need it.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            if item[0] <= time.monotonic():
+                del self._data[key]
+                return default
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data.pop(key, None)
+            while len(self._data) >= self.maxsize:
+                del self._data[next(iter(self._data))]
+            self._data[key] = (expires, value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def discard_where(self, pred: Callable[[Hashable, Any], bool]) -> None:
+        with self._lock:
+            for k in [k for k, (_, v) in self._data.items() if pred(k, v)]:
+                del self._data[k]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# fallback for get_json/set_json when Redis is off; bounded, since keys like
+# admin:users:{limit}:{offset} are open-ended and expired ones are only dropped on read
+_LOCAL = TTLCache(maxsize=1024)
+
+# XRPL re-fetches and repeat single-tx calls replay the same inputs
+SCORE_CACHE = TTLCache(maxsize=50_000, ttl=3600)
@@ -3,12 +3,21 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from decimal import Decimal
 from pathlib import Path
 from typing import Dict, List, Pattern, Literal, Any, Optional
 
+import numpy as np
+import pandas as pd
 import yaml
 
+# google-re2 is optional: linear-time DFA matching for large keyword sets
+try:
+    import re2 as _re_engine  # type: ignore[import-not-found]
+    RE2_AVAILABLE = True
+except Exception:
+    _re_engine = re
+    RE2_AVAILABLE = False
+
 # ----- Paths / config loading -----
 ROOT = Path(__file__).resolve().parents[1]
 CONFIG_PATH = ROOT / "automation" / "tagging.yaml"
@@ -36,17 +45,51 @@ KEYWORD_PATTERNS: Dict[str, List[Pattern[str]]] = {
     cat: [re.compile(rf"\b{re.escape(w)}\b", re.IGNORECASE) for w in words]
     for cat, words in KEYWORDS.items()
 }
+# One alternation per category: a single finditer() pass per category finds
+# every keyword hit, instead of one search() per word.
+COMBINED_PATTERNS: Dict[str, Pattern[str]] = {
+    cat: re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + r")\b", re.IGNORECASE)
+    for cat, words in KEYWORDS.items()
+    if words
+}
 
-# ----- Helpers -----
-def _as_decimal(x) -> Decimal:
-    if x is None:
-        return Decimal("0")
-    if isinstance(x, Decimal):
-        return x
+def _scan_pattern(pat: Pattern[str]):
+    """Same alternation on the faster engine when available (stdlib pattern otherwise)."""
+    if not RE2_AVAILABLE:
+        return pat
     try:
-        return Decimal(str(x))
+        return _re_engine.compile("(?i)" + pat.pattern)
     except Exception:
-        return Decimal("0")
+        return pat
+
+# category -> lowercased keyword -> reason text (same wording as the per-word patterns)
+WORD_LOOKUP: Dict[str, Dict[str, str]] = {
+    cat: {w.lower(): f"Keyword match: {pat.pattern}" for w, pat in zip(words, KEYWORD_PATTERNS[cat])}
+    for cat, words in KEYWORDS.items()
+}
+# lowercased keyword -> every category listing it (a word may sit in several)
+WORD_CATEGORIES: Dict[str, List[str]] = {}
+for _cat, _words in WORD_LOOKUP.items():
+    for _w in _words:
+        WORD_CATEGORIES.setdefault(_w, []).append(_cat)
+# All categories in one alternation: the per-tx scan walks the memo once and
+# attributes each hit through WORD_CATEGORIES. DataFrame paths keep the
+# per-category stdlib patterns for pandas.
+MEGA_PATTERN: Optional[Pattern[str]] = (
+    re.compile(r"\b(?:" + "|".join(re.escape(w) for w in WORD_CATEGORIES) + r")\b", re.IGNORECASE)
+    if WORD_CATEGORIES else None
+)
+_MEGA_SCAN = _scan_pattern(MEGA_PATTERN) if MEGA_PATTERN is not None else None
+
+_IN_DIRECTIONS = frozenset({"in", "incoming", "credit"})
+_OUT_DIRECTIONS = frozenset({"out", "outgoing", "debit"})
+
+# ----- Helpers -----
+def _as_float(x) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return 0.0
 
 def _norm(text: Optional[str]) -> str:
     return (text or "").strip()
@@ -85,11 +128,20 @@ def tag_categories(tx, address_book: AddressBook | None = None) -> List[TagResul
     Compatible with any Transaction that has .memo, .fee, .amount, .direction.
     """
     memo = _norm(getattr(tx, "memo", None))
-    fee = _as_decimal(getattr(tx, "fee", None))
-    amount = _as_decimal(getattr(tx, "amount", None))
+    # only compared against 0 below, so floats are exact enough
+    fee = _as_float(getattr(tx, "fee", None))
+    amount = _as_float(getattr(tx, "amount", None))
     direction = _norm(getattr(tx, "direction", None)).lower()
 
-    results: List[TagResult] = []
+    by_cat: Dict[str, TagResult] = {}
+
+    def _bump(cat: str, delta: float, reason: str) -> None:
+        r = by_cat.get(cat)
+        if r:
+            r.score += delta
+            r.reasons.append(TagReason(cat, reason))
+        else:
+            by_cat[cat] = TagResult(category=cat, score=delta, reasons=[TagReason(cat, reason)])
 
     weights = {
         "keyword": 0.6,
@@ -101,66 +153,31 @@ def tag_categories(tx, address_book: AddressBook | None = None) -> List[TagResul
 
     # 1) Fees heuristic
     if fee > 0 and amount <= 0:
-        results.append(TagResult(
-            category="fee",
-            score=weights["fee_signal"],
-            reasons=[TagReason("fee", "Positive fee + nonpositive amount")]
-        ))
-
-    # 2) Keyword hits per category
-    for cat, patterns in KEYWORD_PATTERNS.items():
-        for pat in patterns:
-            if pat.search(memo):
-                found = next((r for r in results if r.category == cat), None)
-                if found:
-                    found.score += weights["keyword"]
-                    found.reasons.append(TagReason(cat, f"Keyword match: {pat.pattern}"))
-                else:
-                    results.append(TagResult(
-                        category=cat,
-                        score=weights["keyword"],
-                        reasons=[TagReason(cat, f"Keyword match: {pat.pattern}")]
-                    ))
+        _bump("fee", weights["fee_signal"], "Positive fee + nonpositive amount")
+
+    # 2) Keyword hits per category (each distinct keyword counts once)
+    if _MEGA_SCAN is not None:
+        hits: Dict[str, Dict[str, None]] = {}  # category -> distinct words, memo order
+        for m in _MEGA_SCAN.finditer(memo):
+            word = m.group(0).lower()
+            for cat in WORD_CATEGORIES.get(word, ()):
+                hits.setdefault(cat, {})[word] = None
+        for cat in KEYWORDS if hits else ():  # bump in category order, as before
+            for word in hits.get(cat, ()):
+                _bump(cat, weights["keyword"], WORD_LOOKUP[cat][word])
 
     # 3) Internal transfers boost
     if _is_internal_transfer(tx, address_book):
-        found = next((r for r in results if r.category == "transfer"), None)
-        if found:
-            found.score += weights["internal_transfer"]
-            found.reasons.append(TagReason("transfer", "Internal transfer (same owner)"))
-        else:
-            results.append(TagResult(
-                category="transfer",
-                score=weights["internal_transfer"],
-                reasons=[TagReason("transfer", "Internal transfer (same owner)")]
-            ))
+        _bump("transfer", weights["internal_transfer"], "Internal transfer (same owner)")
 
     # 4) Direction soft signal
-    if direction in {"in", "incoming", "credit"}:
-        found = next((r for r in results if r.category == "income"), None)
-        if found:
-            found.score += weights["direction_in"]
-            found.reasons.append(TagReason("income", "Direction suggests inbound"))
-        else:
-            results.append(TagResult(
-                category="income",
-                score=weights["direction_in"],
-                reasons=[TagReason("income", "Direction suggests inbound")]
-            ))
-    elif direction in {"out", "outgoing", "debit"}:
-        found = next((r for r in results if r.category == "expense"), None)
-        if found:
-            found.score += weights["direction_out"]
-            found.reasons.append(TagReason("expense", "Direction suggests outbound"))
-        else:
-            results.append(TagResult(
-                category="expense",
-                score=weights["direction_out"],
-                reasons=[TagReason("expense", "Direction suggests outbound")]
-            ))
+    if direction in _IN_DIRECTIONS:
+        _bump("income", weights["direction_in"], "Direction suggests inbound")
+    elif direction in _OUT_DIRECTIONS:
+        _bump("expense", weights["direction_out"], "Direction suggests outbound")
 
-    results.sort(key=lambda r: r.score, reverse=True)
-    return results
+    # sorted() is stable, so ties keep first-signal order like before
+    return sorted(by_cat.values(), key=lambda r: r.score, reverse=True)
 
 def tag_category(tx, address_book: AddressBook | None = None) -> Category:
     """Pick a single winner (scores first; PRIORITY breaks ties)."""
@@ -178,3 +195,44 @@ def tag_category(tx, address_book: AddressBook | None = None) -> Category:
             if r.category == pref:
                 return r.category
     return contenders[0].category
+
+def tag_category_df(df: pd.DataFrame, address_book: AddressBook | None = None) -> pd.Series:
+    """
+    Column-wise tag_category over a DataFrame with memo/fee/amount/direction
+    (and from_addr/to_addr when an address book is given). Same scores and
+    tie-breaking as the scalar version.
+    """
+    n = len(df)
+    def col(name: str, default: Any) -> pd.Series:
+        return df[name] if name in df.columns else pd.Series(default, index=df.index)
+
+    memo = col("memo", "").fillna("").astype(str).str.strip()
+    fee = pd.to_numeric(col("fee", 0.0), errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    amount = pd.to_numeric(col("amount", 0.0), errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    direction = col("direction", "").fillna("").astype(str).str.strip().str.lower()
+
+    scores: Dict[str, np.ndarray] = {}
+    def bump(cat: str, add: np.ndarray) -> None:
+        scores[cat] = scores.get(cat, np.zeros(n)) + add
+
+    bump("fee", 1.0 * ((fee > 0) & (amount <= 0)))
+    for cat, gate in COMBINED_PATTERNS.items():
+        # distinct keywords per row: each matching word scores 0.6
+        hits = memo.str.findall(gate).map(lambda ws: len({w.lower() for w in ws}))
+        bump(cat, 0.6 * hits.to_numpy(dtype=float))
+    if address_book:
+        fa = col("from_addr", "").fillna("").astype(str).str.strip().str.lower()
+        ta = col("to_addr", "").fillna("").astype(str).str.strip().str.lower()
+        owned = list(address_book.owned)
+        internal = (fa.ne("") & ta.ne("") & fa.isin(owned) & ta.isin(owned)).to_numpy()
+        bump("transfer", 1.0 * internal)
+    bump("income", 0.4 * direction.isin(_IN_DIRECTIONS).to_numpy())
+    bump("expense", 0.4 * direction.isin(_OUT_DIRECTIONS).to_numpy())
+
+    # Candidates in tie-break order; rounding keeps 0.6+0.4 == 1.0 ties exact.
+    order = [c for c in PRIORITY + ["expense"] if c in scores]
+    order += [c for c in scores if c not in order]
+    mat = np.round(np.column_stack([scores[c] for c in order]), 6)
+    best = mat.max(axis=1)
+    conds = [(mat[:, i] > 0) & (mat[:, i] == best) for i in range(len(order))]
+    return pd.Series(np.select(conds, order, default="unknown"), index=df.index)
@@ -3,11 +3,14 @@ from fastapi import Depends, HTTPException, Request, status
 from jwt import ExpiredSignatureError, InvalidTokenError, DecodeError
 
 from . import store
+from ._cookies import SESSION_COOKIE
 from .security_session import decode_jwt
 from .settings import get_settings
 
 S = get_settings()
 
+_MISSING = object()  # "not resolved yet" (None is a valid cached result)
+
 def _lookup_user_by_sub(sub: str) -> Optional[dict]:
     """
     `sub` may be a numeric user id OR an email. Try both.
@@ -44,10 +47,18 @@ def _lookup_user_by_sub(sub: str) -> Optional[dict]:
 
 def current_user(request: Request) -> Optional[dict]:
     """
-    Reads JWT from cookie 'session' or Authorization: Bearer <jwt>.
-    Returns a user dict or None.
+    Reads JWT from the session cookie or Authorization: Bearer <jwt>.
+    Returns a user dict or None. Resolved once per request (cached on request.state).
     """
-    token: Optional[str] = request.cookies.get("session")
+    cached = getattr(request.state, "_cached_user", _MISSING)
+    if cached is not _MISSING:
+        return cached
+    user = _resolve_user(request)
+    request.state._cached_user = user
+    return user
+
+def _resolve_user(request: Request) -> Optional[dict]:
+    token: Optional[str] = request.cookies.get(SESSION_COOKIE)
 
     if not token:
         auth = request.headers.get("Authorization", "")
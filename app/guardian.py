@@ -1,96 +1,212 @@
 ﻿from __future__ import annotations
-from decimal import Decimal
-from typing import Any, Iterable, Optional
+import re
+from functools import lru_cache
+from typing import Any, Iterable, Optional, Sequence
 
-SUSPICIOUS_WORDS = {
+import numpy as np
+import pandas as pd
+
+SUSPICIOUS_WORDS = frozenset({
     "scam", "phish", "hack", "fraud", "ransom", "malware",
     "blackmail", "mixer", "tornado", "sanction", "darknet",
-}
+})
+# memos are lowercased before matching; tokenize once and intersect with the word set
+# (whole words only: "scamper" is not "scam")
+_TOKEN_RE = re.compile(r"[a-z]+")
 
-def _as_decimal(x: Any, default: str = "0") -> Decimal:
-    if isinstance(x, Decimal):
-        return x
+_OUT_DIRECTIONS = frozenset({"out", "outgoing", "debit"})
+_IN_DIRECTIONS = frozenset({"in", "incoming", "credit"})
+_SANCTION_TAGS = frozenset({"sanctioned", "mixer"})
+
+def _as_float(x: Any, default: float = 0.0) -> float:
     try:
-        return Decimal(str(x))
-    except Exception:
-        return Decimal(default)
+        f = float(x)  # Decimal/int/float/numeric str
+    except (TypeError, ValueError):
+        return default
+    return default if f != f else f  # NaN -> default
 
 def _norm(s: Optional[str]) -> str:
     return (s or "").strip().lower()
 
-def _get(tx: Any, name: str, default=None):
-    if hasattr(tx, name):
-        return getattr(tx, name)
-    if isinstance(tx, dict):
-        return tx.get(name, default)
-    return default
-
 def score_risk(tx: Any) -> tuple[float, list[str]]:
     """
     Returns (score, flags). Score is clamped to [0,1].
     Flags explain which signals contributed; useful for tests & auditing.
     """
-    memo = _norm(_get(tx, "memo", ""))
-    amount = _as_decimal(_get(tx, "amount", 0))
-    fee = _as_decimal(_get(tx, "fee", 0))
-    direction = _norm(_get(tx, "direction", ""))
-    is_internal = bool(_get(tx, "is_internal", False))
+    # pick the accessor once (dict rows vs Transaction-like objects), not per field
+    if isinstance(tx, dict):
+        get = tx.get
+    else:
+        get = lambda name, default=None: getattr(tx, name, default)  # noqa: E731
 
-    tags: Iterable[str] = _get(tx, "tags", []) or []
+    memo = _norm(get("memo", ""))
+    amount = _as_float(get("amount", 0))
+    fee = _as_float(get("fee", 0))
+    direction = _norm(get("direction", ""))
+    is_internal = bool(get("is_internal", False))
+
+    tags: Iterable[str] = get("tags", []) or []
     tags = {_norm(t) for t in tags}
 
-    score = Decimal("0.10")
+    # plain floats: only 0.05-step increments, rounded once at the end
+    score = 0.10
     flags: list[str] = []
 
     # Direction & magnitude (keeps your thresholds; adds flags)
-    if direction in {"out", "outgoing", "debit"}:
+    if direction in _OUT_DIRECTIONS:
         flags.append("outgoing")
         mag = abs(amount)
         if mag > 0:
-            score += Decimal("0.10")
+            score += 0.10
         if mag > 100:
-            score += Decimal("0.10"); flags.append("medium_outgoing")
+            score += 0.10; flags.append("medium_outgoing")
         if mag > 1000:
-            score += Decimal("0.15"); flags.append("large_outgoing")
+            score += 0.15; flags.append("large_outgoing")
         if mag > 10000:
-            score += Decimal("0.15"); flags.append("very_large_outgoing")
-    elif direction in {"in", "incoming", "credit"}:
+            score += 0.15; flags.append("very_large_outgoing")
+    elif direction in _IN_DIRECTIONS:
         flags.append("incoming")
-        score -= Decimal("0.05")
+        score -= 0.05
 
     # Fee pressure
     if fee > 0:
-        score += Decimal("0.05"); flags.append("fee_present")
+        score += 0.05; flags.append("fee_present")
         if amount != 0:
-            ratio = (fee / abs(amount)) if abs(amount) > 0 else Decimal("0")
-            if ratio > Decimal("0.01"):
-                score += Decimal("0.05"); flags.append("high_fee_ratio")
-            if ratio > Decimal("0.05"):
-                score += Decimal("0.10"); flags.append("very_high_fee_ratio")
+            ratio = fee / abs(amount)
+            if ratio > 0.01:
+                score += 0.05; flags.append("high_fee_ratio")
+            if ratio > 0.05:
+                score += 0.10; flags.append("very_high_fee_ratio")
 
     # Suspicious memo keywords
-    if memo:
-        hits = sum(1 for w in SUSPICIOUS_WORDS if w in memo)
-        if hits:
-            score += Decimal("0.20") + Decimal("0.05") * hits
-            flags.append("suspicious_memo")
+    hits = len(SUSPICIOUS_WORDS.intersection(_TOKEN_RE.findall(memo)))  # distinct words
+    if hits:
+        score += 0.20 + 0.05 * hits
+        flags.append("suspicious_memo")
 
     # Tag-based adjustments
-    if "sanctioned" in tags or "mixer" in tags:
-        score += Decimal("0.20"); flags.append("sanctioned_or_mixer")
+    if not _SANCTION_TAGS.isdisjoint(tags):
+        score += 0.20; flags.append("sanctioned_or_mixer")
 
     # Internal transfers reduce risk
     if is_internal:
-        score -= Decimal("0.25"); flags.append("internal_transfer")
-
-    # Clamp to [0, 1]
-    if score < 0:
-        score = Decimal("0")
-    if score > 1:
-        score = Decimal("1")
+        score -= 0.25; flags.append("internal_transfer")
 
-    return float(score), flags
+    # Round away float drift (same values the Decimal version produced), clamp to [0, 1]
+    return max(0.0, min(1.0, round(score, 4))), flags
 
 # Back-compat: old callers that expect just a float can use this.
 def score_risk_value(tx: Any) -> float:
     return score_risk(tx)[0]
+
+# ---------- Vectorized (DataFrame) scoring ----------
+
+# Bit per flag, in the order score_risk emits them (decode_flags keeps that order)
+FLAG_BITS = {
+    "outgoing": 1 << 0,
+    "medium_outgoing": 1 << 1,
+    "large_outgoing": 1 << 2,
+    "very_large_outgoing": 1 << 3,
+    "incoming": 1 << 4,
+    "fee_present": 1 << 5,
+    "high_fee_ratio": 1 << 6,
+    "very_high_fee_ratio": 1 << 7,
+    "suspicious_memo": 1 << 8,
+    "sanctioned_or_mixer": 1 << 9,
+    "internal_transfer": 1 << 10,
+}
+
+def encode_flags(flags: Iterable[str]) -> int:
+    """Pack flag names into the FLAG_BITS integer (unknown names are ignored)."""
+    x = 0
+    for f in flags:
+        x |= FLAG_BITS.get(f, 0)
+    return x
+
+@lru_cache(maxsize=2048)
+def _decode(x: int) -> tuple[str, ...]:
+    return tuple(name for name, bit in FLAG_BITS.items() if x & bit)
+
+def decode_flags(x: int) -> list[str]:
+    """Flag names set in a FLAG_BITS integer, in score_risk order."""
+    return list(_decode(x))
+
+def _col(df: pd.DataFrame, name: str, default: Any) -> pd.Series:
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index)
+
+def score_risk_df(df: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
+    """
+    Column-wise score_risk over a whole DataFrame (same rules and flags).
+    Returns (scores, flags) aligned to df.index; flags holds a list per row.
+    """
+    memo = _col(df, "memo", "").fillna("").astype(str).str.strip().str.lower()
+    amount = pd.to_numeric(_col(df, "amount", 0.0), errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    fee = pd.to_numeric(_col(df, "fee", 0.0), errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    direction = _col(df, "direction", "").fillna("").astype(str).str.strip().str.lower()
+    is_internal = _col(df, "is_internal", False).fillna(False).astype(bool).to_numpy()
+
+    out = direction.isin(_OUT_DIRECTIONS).to_numpy()
+    inc = direction.isin(_IN_DIRECTIONS).to_numpy()
+    mag = np.abs(amount)
+
+    medium = out & (mag > 100)
+    large = out & (mag > 1000)
+    very_large = out & (mag > 10000)
+
+    fee_present = fee > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(mag > 0, fee / np.where(mag > 0, mag, 1.0), 0.0)
+    high_ratio = fee_present & (ratio > 0.01)
+    very_high_ratio = fee_present & (ratio > 0.05)
+
+    hits = memo.str.findall(_TOKEN_RE).map(lambda ts: len(SUSPICIOUS_WORDS.intersection(ts))).to_numpy(dtype=int)
+    suspicious = hits > 0
+
+    if "tags" in df.columns:
+        sanctioned = df["tags"].map(
+            lambda ts: not _SANCTION_TAGS.isdisjoint(_norm(t) for t in (ts or []))
+        ).to_numpy(dtype=bool)
+    else:
+        sanctioned = np.zeros(len(df), dtype=bool)
+
+    score = np.full(len(df), 0.10)
+    score += 0.10 * (out & (mag > 0)) + 0.10 * medium + 0.15 * large + 0.15 * very_large
+    score -= 0.05 * inc
+    score += 0.05 * fee_present + 0.05 * high_ratio + 0.10 * very_high_ratio
+    score += np.where(suspicious, 0.20 + 0.05 * hits, 0.0)
+    score += 0.20 * sanctioned
+    score -= 0.25 * is_internal
+    # float sums of 0.05 steps drift; round back to the scalar (Decimal) values
+    score = np.clip(np.round(score, 4), 0.0, 1.0)
+
+    # one uint16 bitmask per row; flag lists are decoded once per distinct mask
+    bits = np.zeros(len(df), dtype=np.uint16)
+    for name, hit in (
+        ("outgoing", out), ("medium_outgoing", medium), ("large_outgoing", large),
+        ("very_large_outgoing", very_large), ("incoming", inc), ("fee_present", fee_present),
+        ("high_fee_ratio", high_ratio), ("very_high_fee_ratio", very_high_ratio),
+        ("suspicious_memo", suspicious), ("sanctioned_or_mixer", sanctioned),
+        ("internal_transfer", is_internal),
+    ):
+        bits |= hit.astype(np.uint16) * np.uint16(FLAG_BITS[name])
+    uniq, inverse = np.unique(bits, return_inverse=True)
+    decoded = [decode_flags(int(x)) for x in uniq.tolist()]
+    flags = [list(decoded[i]) for i in inverse.tolist()]
+
+    return pd.Series(score, index=df.index), pd.Series(flags, index=df.index, dtype=object)
+
+_BATCH_FIELDS = (("memo", ""), ("amount", 0), ("fee", 0), ("direction", ""), ("is_internal", False), ("tags", None))
+
+def score_risk_batch(txs: Sequence[Any]) -> tuple[np.ndarray, list[list[str]]]:
+    """
+    score_risk over a list of transactions (objects or dicts) in one vectorized pass.
+    Returns (scores array, flags per tx) in input order.
+    """
+    cols = {
+        name: [tx.get(name, default) if isinstance(tx, dict) else getattr(tx, name, default) for tx in txs]
+        for name, default in _BATCH_FIELDS
+    }
+    scores, flags = score_risk_df(pd.DataFrame(cols, index=pd.RangeIndex(len(txs))))
+    return scores.to_numpy(dtype=np.float64), flags.tolist()
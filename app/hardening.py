@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import os
 import hmac
+import itertools
 import secrets
 from typing import Optional, Callable, Awaitable
 
@@ -13,34 +14,65 @@ from starlette.middleware.base import BaseHTTPMiddleware
 REQ_ID_HEADER = "X-Request-ID"
 CSRF_COOKIE = "csrf_token"
 CSRF_HEADER = "X-CSRF-Token"
+_UNSAFE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+# Request ids only need to be unique, not unpredictable: one random per-process
+# prefix + a counter (16 hex chars, like token_hex(8)) instead of a CSPRNG call per request.
+_RID_PREFIX = secrets.token_hex(4)
+_RID_COUNTER = itertools.count()
+
+
+def _reseed_request_ids() -> None:
+    global _RID_PREFIX, _RID_COUNTER
+    _RID_PREFIX = secrets.token_hex(4)
+    _RID_COUNTER = itertools.count()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reseed_request_ids)  # forked workers must not share ids
+
+
+def new_request_id() -> str:
+    return f"{_RID_PREFIX}{next(_RID_COUNTER) & 0xFFFFFFFF:08x}"
+
+
+_CSP = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline'; "
+    "style-src 'self' 'unsafe-inline'; "
+    "img-src 'self' data:; "
+    "connect-src 'self' ws: wss:; "
+    "object-src 'none'; base-uri 'self'; frame-ancestors 'none'"
+)
+# Built once at import; env is not re-read per response.
+_SECURITY_HEADERS = (
+    ("Content-Security-Policy", _CSP),
+    ("X-Content-Type-Options", "nosniff"),
+    ("X-Frame-Options", "DENY"),
+    ("Referrer-Policy", "strict-origin-when-cross-origin"),
+    ("Permissions-Policy", "camera=(), microphone=(), geolocation=()"),
+)
+_HSTS_ENABLED = os.getenv("ENABLE_HSTS", "true").lower() == "true"
+_HSTS_VALUE = "max-age=31536000; includeSubDomains; preload"
 
 
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     """Sets a strict, but UI-friendly baseline of security headers."""
     async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]):
         resp: Response = await call_next(request)
-        csp = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline'; "
-            "style-src 'self' 'unsafe-inline'; "
-            "img-src 'self' data:; "
-            "connect-src 'self' ws: wss:; "
-            "object-src 'none'; base-uri 'self'; frame-ancestors 'none'"
-        )
-        resp.headers.setdefault("Content-Security-Policy", csp)
-        resp.headers.setdefault("X-Content-Type-Options", "nosniff")
-        resp.headers.setdefault("X-Frame-Options", "DENY")
-        resp.headers.setdefault("Referrer-Policy", "strict-origin-when-cross-origin")
-        resp.headers.setdefault("Permissions-Policy", "camera=(), microphone=(), geolocation=()")
-        if (os.getenv("ENABLE_HSTS", "true").lower() == "true") and request.url.scheme == "https":
-            resp.headers.setdefault("Strict-Transport-Security", "max-age=31536000; includeSubDomains; preload")
+        h = resp.headers
+        for k, v in _SECURITY_HEADERS:
+            h.setdefault(k, v)
+        if _HSTS_ENABLED and request.url.scheme == "https":
+            h.setdefault("Strict-Transport-Security", _HSTS_VALUE)
         return resp
 
 
 class RequestIDMiddleware(BaseHTTPMiddleware):
     """Adds/propagates a stable request id for traceability."""
     async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]):
-        rid = request.headers.get(REQ_ID_HEADER) or secrets.token_hex(8)
+        rid = request.headers.get(REQ_ID_HEADER) or new_request_id()
         request.state.request_id = rid
         resp: Response = await call_next(request)
         resp.headers.setdefault(REQ_ID_HEADER, rid)
@@ -67,7 +99,7 @@ def verify_csrf(request: Request) -> None:
 
 async def csrf_guard(request: Request):
     """FastAPI dependency to protect unsafe UI methods."""
-    if request.method in ("POST", "PUT", "PATCH", "DELETE"):
+    if request.method in _UNSAFE_METHODS:
         verify_csrf(request)
     return True
 
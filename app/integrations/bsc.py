@@ -1,16 +1,22 @@
-import os, requests
+import os, time, requests
 from typing import List, Dict, Any
-from datetime import datetime
 from ..models import Transaction
 
 BSC_API = "https://publicapi.dev/bscscan-api/api"
 BSC_KEY = os.getenv("BSC_API_KEY", "").strip()  # set me
+_WEI_PER_BNB = 10 ** 18
+
+# keep-alive: reuse the TCP/TLS connection across calls
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "klerno/1.0"})
 
 def _ts(sec: str | int) -> str:
+    # f-string over the gmtime fields: no strftime format parsing per tx
     try:
-        return datetime.utcfromtimestamp(int(sec)).strftime("%Y-%m-%dT%H:%M:%S")
+        t = time.gmtime(int(sec))
     except Exception:
-        return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
+        t = time.gmtime()
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
 
 def fetch_account_tx(address: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Uses bscscan 'txlist' equivalent (publicapi.dev route)."""
@@ -25,7 +31,7 @@ def fetch_account_tx(address: str, limit: int = 10) -> List[Dict[str, Any]]:
         "sort": "desc",
         "apikey": BSC_KEY or "free",  # publicapi.dev supports no-key; key recommended
     }
-    r = requests.get(BSC_API, params=params, timeout=20)
+    r = _SESSION.get(BSC_API, params=params, timeout=20)
     r.raise_for_status()
     data = r.json()
     # Both bscscan and publicapi.dev return {"status":"1","message":"OK","result":[...]} or similar
@@ -40,8 +46,8 @@ def bsc_json_to_transactions(address: str, payload: List[Dict[str, Any]]) -> Lis
             to_addr   = str(it.get("to","")).lower()
             # native BNB transfer value is in wei
             value_wei = int(it.get("value", 0))
-            amount = value_wei / 10**18
-            fee = (int(it.get("gasPrice", 0)) * int(it.get("gasUsed", it.get("gas", 0) or 0))) / 10**18
+            amount = value_wei / _WEI_PER_BNB
+            fee = (int(it.get("gasPrice", 0)) * int(it.get("gasUsed", it.get("gas", 0) or 0))) / _WEI_PER_BNB
             direction = "in" if to_addr == addr else ("out" if from_addr == addr else "")
             tx = Transaction(
                 tx_id = it.get("hash") or "",
@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
 import requests
@@ -12,6 +13,14 @@ from ..models import Transaction
 BASE_URL = "https://api.bscscan.com/api"
 DEFAULT_LIMIT = 25
 
+# keep-alive: reuse the TCP/TLS connection across calls
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "klerno/1.0"})
+
+# shared pool for the per-address fan-out (no thread start-up per call)
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="bscscan")
+_ACTIONS = {"normal": "txlist", "token": "tokentx", "internal": "txlistinternal"}
+
 def _api_key(explicit: Optional[str] = None) -> str:
     # Prefer explicit key, else env
     return (explicit or os.getenv("BSC_API_KEY") or "").strip()
@@ -21,31 +30,35 @@ def _get(params: Dict[str, Any], api_key: Optional[str]) -> Dict[str, Any]:
     key = _api_key(api_key)
     if key:
         p["apikey"] = key
-    r = requests.get(BASE_URL, params=p, timeout=15)
+    r = _SESSION.get(BASE_URL, params=p, timeout=15)
     r.raise_for_status()
     data = r.json()
     # BscScan returns {"status":"1","message":"OK","result":[...]} on success
     return data
 
+# token decimals are 0..36 in practice; look the divisor up instead of pow() per record
+_POW10 = tuple(10 ** i for i in range(37))
+
 def _wei_to_bnb(x: str) -> float:
     try:
-        return int(x) / 1e18
+        return int(x) / _POW10[18]
     except Exception:
         return 0.0
 
 def _scale(value_str: str, decimals: str) -> float:
     try:
-        d = int(decimals or "18")
-        return int(value_str) / (10 ** d)
+        d = int(decimals or 18)
+        return int(value_str) / (_POW10[d] if 0 <= d < 37 else 10 ** d)
     except Exception:
         return 0.0
 
 def _ts_to_iso(sec_str: str) -> str:
+    # f-string over the gmtime fields: no strftime format parsing per tx
     try:
-        sec = int(sec_str)
-        return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+        t = time.gmtime(int(sec_str))
     except Exception:
         return ""
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
 
 def fetch_account_tx_bscscan(
     address: str,
@@ -60,11 +73,88 @@ def fetch_account_tx_bscscan(
     offset = max(1, min(limit, 10000))
     common = {"address": address, "startblock": 0, "endblock": 99999999, "page": 1, "offset": offset, "sort": "desc"}
 
-    normal = _get({"module": "account", "action": "txlist", **common}, api_key).get("result", []) or []
-    token  = _get({"module": "account", "action": "tokentx", **common}, api_key).get("result", []) or []
-    internal = _get({"module": "account", "action": "txlistinternal", **common}, api_key).get("result", []) or []
+    # the three lists are independent; wall time is the slowest call, not the sum
+    futs = {
+        kind: _EXECUTOR.submit(_get, {"module": "account", "action": action, **common}, api_key)
+        for kind, action in _ACTIONS.items()
+    }
+    return {kind: f.result().get("result", []) or [] for kind, f in futs.items()}
+
+def _direction(it: Dict[str, Any], acct: str) -> str:
+    from_addr = (it.get("from") or "").lower()
+    to_addr   = (it.get("to") or "").lower()
+    return "in" if to_addr == acct else ("out" if from_addr == acct else "other")
+
+def _mk_normal(it: Dict[str, Any], acct: str) -> Optional[Transaction]:
+    """Native BNB send → Transaction (None if the record is malformed)."""
+    try:
+        fee = 0.0
+        try:
+            gas_price = int(it.get("gasPrice") or "0")
+            gas_used  = int(it.get("gasUsed") or "0")
+            fee = (gas_price * gas_used) / _POW10[18]
+        except Exception:
+            pass
+
+        return Transaction(
+            tx_id      = it.get("hash") or "",
+            timestamp  = _ts_to_iso(it.get("timeStamp") or ""),
+            chain      = "BSC",
+            from_addr  = it.get("from") or "",
+            to_addr    = it.get("to") or "",
+            amount     = _wei_to_bnb(it.get("value") or "0"),
+            symbol     = "BNB",
+            direction  = _direction(it, acct),
+            memo       = (it.get("functionName") or "").strip() or "",
+            fee        = fee,
+        )
+    except Exception:
+        return None
+
+def _mk_token(it: Dict[str, Any], acct: str) -> Optional[Transaction]:
+    """BEP-20 token transfer → Transaction (None if the record is malformed)."""
+    try:
+        symbol = (it.get("tokenSymbol") or "").upper() or "TOKEN"
+        return Transaction(
+            tx_id      = it.get("hash") or "",
+            timestamp  = _ts_to_iso(it.get("timeStamp") or ""),
+            chain      = "BSC",
+            from_addr  = it.get("from") or "",
+            to_addr    = it.get("to") or "",
+            amount     = _scale(it.get("value") or "0", it.get("tokenDecimal") or "18"),
+            symbol     = symbol,
+            direction  = _direction(it, acct),
+            memo       = f"{it.get('tokenName') or ''} ({symbol})",
+            fee        = 0.0,  # fee is on the parent tx; already accounted in "normal"
+        )
+    except Exception:
+        return None
+
+def _mk_internal(it: Dict[str, Any], acct: str) -> Optional[Transaction]:
+    """Contract-triggered value transfer → Transaction (None if malformed)."""
+    try:
+        return Transaction(
+            tx_id      = it.get("hash") or "",
+            timestamp  = _ts_to_iso(it.get("timeStamp") or ""),
+            chain      = "BSC",
+            from_addr  = it.get("from") or "",
+            to_addr    = it.get("to") or "",
+            amount     = _wei_to_bnb(it.get("value") or "0"),
+            symbol     = "BNB",
+            direction  = _direction(it, acct),
+            memo       = "internal",
+            fee        = 0.0,
+        )
+    except Exception:
+        return None
 
-    return {"normal": normal, "token": token, "internal": internal}
+def _unique(rows: List[Dict[str, Any]], *fields: str) -> List[Dict[str, Any]]:
+    """First record per key, in payload order (non-dict junk is dropped)."""
+    first: Dict[tuple, Dict[str, Any]] = {}
+    for it in rows:
+        if isinstance(it, dict):
+            first.setdefault(tuple(it.get(f) for f in fields), it)
+    return list(first.values())
 
 def bscscan_json_to_transactions(
     account: str,
@@ -74,100 +164,15 @@ def bscscan_json_to_transactions(
     Normalize BscScan payloads → List[Transaction] (native BNB, token, internal).
     """
     acct = (account or "").lower().strip()
-    items: List[Transaction] = []
-    seen = set()
 
-    # ---- Normal (native BNB sends)
-    for it in payload.get("normal", []):
-        try:
-            key = ("normal", it.get("hash"))
-            if key in seen: 
-                continue
-            seen.add(key)
-
-            from_addr = (it.get("from") or "").lower()
-            to_addr   = (it.get("to") or "").lower()
-            direction = "in" if to_addr == acct else ("out" if from_addr == acct else "other")
-
-            fee = 0.0
-            try:
-                gas_price = int(it.get("gasPrice") or "0")
-                gas_used  = int(it.get("gasUsed") or "0")
-                fee = (gas_price * gas_used) / 1e18
-            except Exception:
-                pass
-
-            items.append(Transaction(
-                tx_id      = it.get("hash") or "",
-                timestamp  = _ts_to_iso(it.get("timeStamp") or ""),
-                chain      = "BSC",
-                from_addr  = it.get("from") or "",
-                to_addr    = it.get("to") or "",
-                amount     = _wei_to_bnb(it.get("value") or "0"),
-                symbol     = "BNB",
-                direction  = direction,
-                memo       = (it.get("functionName") or "").strip() or "",
-                fee        = fee,
-            ))
-        except Exception:
-            continue
+    # Dedup within each kind (normal by hash, token by hash+logIndex, internal by hash+traceId)
+    normal = _unique(payload.get("normal", []), "hash")
+    token = _unique(payload.get("token", []), "hash", "logIndex")
+    internal = _unique(payload.get("internal", []), "hash", "traceId")
 
-    # ---- Token transfers (BEP-20)
-    for it in payload.get("token", []):
-        try:
-            key = ("token", it.get("hash"), it.get("logIndex"))
-            if key in seen:
-                continue
-            seen.add(key)
-
-            from_addr = (it.get("from") or "").lower()
-            to_addr   = (it.get("to") or "").lower()
-            direction = "in" if to_addr == acct else ("out" if from_addr == acct else "other")
-
-            amount = _scale(it.get("value") or "0", it.get("tokenDecimal") or "18")
-            symbol = (it.get("tokenSymbol") or "").upper() or "TOKEN"
-
-            items.append(Transaction(
-                tx_id      = it.get("hash") or "",
-                timestamp  = _ts_to_iso(it.get("timeStamp") or ""),
-                chain      = "BSC",
-                from_addr  = it.get("from") or "",
-                to_addr    = it.get("to") or "",
-                amount     = amount,
-                symbol     = symbol,
-                direction  = direction,
-                memo       = f"{it.get('tokenName') or ''} ({symbol})",
-                fee        = 0.0,  # fee is on the parent tx; already accounted in "normal"
-            ))
-        except Exception:
-            continue
-
-    # ---- Internal tx (value transfers triggered by contracts)
-    for it in payload.get("internal", []):
-        try:
-            key = ("internal", it.get("hash"), it.get("traceId"))
-            if key in seen:
-                continue
-            seen.add(key)
-
-            from_addr = (it.get("from") or "").lower()
-            to_addr   = (it.get("to") or "").lower()
-            direction = "in" if to_addr == acct else ("out" if from_addr == acct else "other")
-
-            items.append(Transaction(
-                tx_id      = it.get("hash") or "",
-                timestamp  = _ts_to_iso(it.get("timeStamp") or ""),
-                chain      = "BSC",
-                from_addr  = it.get("from") or "",
-                to_addr    = it.get("to") or "",
-                amount     = _wei_to_bnb(it.get("value") or "0"),
-                symbol     = "BNB",
-                direction  = direction,
-                memo       = "internal",
-                fee        = 0.0,
-            ))
-        except Exception:
-            continue
+    items: List[Transaction] = [tx for it in normal if (tx := _mk_normal(it, acct)) is not None]
+    items.extend(tx for it in token if (tx := _mk_token(it, acct)) is not None)
+    items.extend(tx for it in internal if (tx := _mk_internal(it, acct)) is not None)
 
     # newest first
     items.sort(key=lambda x: x.timestamp or "", reverse=True)
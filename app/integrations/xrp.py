@@ -1,38 +1,96 @@
 
-from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
 from ..models import Transaction
 
-def xrpl_json_to_transactions(account: str, tx_list: List[Dict]) -> List[Transaction]:
-    out: List[Transaction] = []
-    for item in tx_list:
-        tx = item.get("tx", {})
-        tx_id = tx.get("hash", "unknown")
-        timestamp = datetime.utcfromtimestamp(tx.get("date", 0) + 946684800)  # XRPL epoch → UNIX
-        from_addr = tx.get("Account", account)
-        to_addr = tx.get("Destination", account)
-        amount_drops = tx.get("Amount", "0")
+_XRPL_EPOCH = 946684800        # 2000-01-01T00:00:00Z as a UNIX timestamp
+_DROPS_PER_XRP = 1_000_000.0
+
+def xrpl_json_to_frame(account: str, tx_list: List[Dict]) -> pd.DataFrame:
+    """
+    account_tx items -> one row per tx, columns named after Transaction fields.
+    One pass to pull the raw values; drop/epoch conversions run column-wise.
+    Non-XRP (IOU object) or unparseable amounts become 0.0.
+    """
+    txs = [item.get("tx", {}) for item in tx_list]
+    n = len(txs)
+    from_addr = [tx.get("Account", account) for tx in txs]
+
+    def numeric(name: str, default: str) -> np.ndarray:
+        raw = [tx.get(name, default) for tx in txs]
         try:
-            amount = float(amount_drops) / 1_000_000.0
-        except Exception:
-            amount = 0.0
-        direction = "out" if from_addr == account else "in"
-        fee = float(tx.get("Fee", "0")) / 1_000_000.0
-        out.append(Transaction(
-            tx_id=tx_id, timestamp=timestamp, chain="XRP",
-            from_addr=from_addr, to_addr=to_addr, amount=amount,
-            symbol="XRP", direction=direction, memo=None, fee=fee
-        ))
-    return out
+            col = np.array(raw, dtype=float)  # the normal case: drop strings / ints
+        except (TypeError, ValueError):
+            col = pd.to_numeric(pd.Series(raw, dtype=object), errors="coerce").to_numpy(dtype=float)
+        return np.nan_to_num(col, nan=0.0)
+
+    seconds = numeric("date", "0") + _XRPL_EPOCH  # XRPL epoch → UNIX
+    timestamps = pd.to_datetime(seconds, unit="s").to_pydatetime()
+    return pd.DataFrame({
+        "tx_id": [tx.get("hash", "unknown") for tx in txs],
+        "timestamp": pd.Series(timestamps, dtype=object),
+        "chain": "XRP",
+        "from_addr": from_addr,
+        "to_addr": [tx.get("Destination", account) for tx in txs],
+        "amount": numeric("Amount", "0") / _DROPS_PER_XRP,
+        "symbol": "XRP",
+        "direction": ["out" if a == account else "in" for a in from_addr],
+        "memo": pd.Series([None] * n, dtype=object),
+        "fee": numeric("Fee", "0") / _DROPS_PER_XRP,
+        "notes": "",
+        "tags": pd.Series([[] for _ in range(n)], dtype=object),
+        "is_internal": False,
+    }, index=pd.RangeIndex(n))
+
+def xrpl_json_to_transactions(account: str, tx_list: List[Dict]) -> List[Transaction]:
+    """Transaction objects for callers that want them; batch paths use xrpl_json_to_frame."""
+    return [Transaction(**rec) for rec in xrpl_json_to_frame(account, tx_list).to_dict("records")]
 
 # --- Read-only XRPL fetch (public endpoint) ---
 import os, requests
+from functools import lru_cache
 
-def fetch_account_tx(account: str, limit: int = 10) -> list[dict]:
-    """
-    Uses XRPL JSON-RPC 'account_tx' to fetch recent transactions for an account.
-    Read-only. No keys. Safe to try.
-    """
+import httpx
+from requests.adapters import HTTPAdapter
+
+# HTTP/2 needs the optional `h2` package; plain keep-alive HTTP/1.1 otherwise
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except Exception:
+    HTTP2_AVAILABLE = False
+
+# keep-alive: reuse the TCP/TLS connection across calls
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "klerno/1.0"})
+# one reconnect on a dropped pooled connection, same as the async transport
+_SESSION.mount("https://", HTTPAdapter(max_retries=1))
+_SESSION.mount("http://", HTTPAdapter(max_retries=1))
+
+
+@lru_cache(maxsize=1)
+def _aclient() -> httpx.AsyncClient:
+    """Shared keep-alive pool for async fetches; created on first use so it binds to the running loop."""
+    # limits/http2 live on the transport: a client ignores its own once a transport is given
+    transport = httpx.AsyncHTTPTransport(
+        retries=1,
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+    return httpx.AsyncClient(timeout=15, transport=transport, headers={"User-Agent": "klerno/1.0"})
+
+
+async def aclose() -> None:
+    """Close the async pool (app shutdown); a later fetch opens a fresh one."""
+    if _aclient.cache_info().currsize:
+        await _aclient().aclose()
+        _aclient.cache_clear()
+
+
+def _account_tx_request(account: str, limit: int) -> tuple[str, dict]:
     url = os.getenv("XRPL_RPC_URL", "https://s1.ripple.com:51234")  # public Ripple server
     payload = {
         "method": "account_tx",
@@ -43,12 +101,37 @@ def fetch_account_tx(account: str, limit: int = 10) -> list[dict]:
             "limit": int(limit)
         }]
     }
+    return url, payload
+
+
+def fetch_account_tx(account: str, limit: int = 10) -> list[dict]:
+    """
+    Uses XRPL JSON-RPC 'account_tx' to fetch recent transactions for an account.
+    Read-only. No keys. Safe to try.
+    """
+    url, payload = _account_tx_request(account, limit)
     try:
-        r = requests.post(url, json=payload, timeout=15)
+        r = _SESSION.post(url, json=payload, timeout=15)
         r.raise_for_status()
         data = r.json()
         # XRPL returns {"result": {"transactions": [...]}}
         return data.get("result", {}).get("transactions", [])
     except Exception as e:
         # Return an empty list on network trouble so the API still responds
-        return []
\ No newline at end of file
+        return []
+
+
+async def fetch_account_tx_async(
+    account: str, limit: int = 10, client: Optional[httpx.AsyncClient] = None
+) -> list[dict]:
+    """
+    fetch_account_tx for async handlers: same result, doesn't block the event loop.
+    Uses the shared pooled client unless one is passed in (tests, fan-out callers).
+    """
+    url, payload = _account_tx_request(account, limit)
+    try:
+        r = await (client or _aclient()).post(url, json=payload)
+        r.raise_for_status()
+        return r.json().get("result", {}).get("transactions", [])
+    except Exception:
+        return []
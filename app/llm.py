@@ -1,70 +1,243 @@
 # app/llm.py
 import os
 import json
+import asyncio
+import hashlib
 import math
-import statistics as stats
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
+from functools import lru_cache
+from itertools import compress
+from typing import List, Dict, Any, NamedTuple, Optional
 
-from dotenv import load_dotenv
-load_dotenv()
+import numpy as np
+import pandas as pd
+
+# orjson is optional: much faster dumps/loads for prompt payloads
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except Exception:
+    ORJSON_AVAILABLE = False
+
+from .cache import TTLCache
+
+# .env is loaded once in app/__init__.py
 
 # ===== OpenAI client (compatible with both legacy 0.28.x and v1+) =====
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 _LLM_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 _DEMO_MODE = os.getenv("DEMO_MODE", "false").lower() == "true"
-
-_use_v1 = False
-_client_v1 = None
-
-# Try the modern SDK first (v1+)
+# Max in-flight LLM requests per batch (keep under your tier's rate limit)
+_LLM_CONCURRENCY = max(1, int(os.getenv("LLM_CONCURRENCY", "20")))
+
+# Retries for rate limits / transient failures (429, 5xx, connection drops)
+_LLM_MAX_ATTEMPTS = max(1, int(os.getenv("LLM_MAX_ATTEMPTS", "5")))
+_RETRY_MIN_SECONDS = 1.0
+_RETRY_MAX_SECONDS = 30.0
+# matched by name so both SDKs work without importing them here:
+# v1 raises openai.*, legacy 0.28 raises openai.error.*
+_RETRYABLE_ERRORS = frozenset({
+    "RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError",
+    "Timeout", "TryAgain", "ServiceUnavailableError",
+})
+_RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+# Completed answers for identical prompts (errors are never cached)
+_RESP_CACHE = TTLCache(maxsize=4096, ttl=3600)
+_CACHE_MAX_TEMPERATURE = 0.3  # above this, answers are meant to vary
+
+# HTTP/2 needs the optional `h2` package; plain keep-alive HTTP/1.1 otherwise
 try:
-    from openai import OpenAI  # only in v1+
-    _client_v1 = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else OpenAI()
-    _use_v1 = True
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
 except Exception:
-    _use_v1 = False
+    HTTP2_AVAILABLE = False
+
+
+class _SDK(NamedTuple):
+    use_v1: bool
+    client: Any   # openai.OpenAI on v1+, the legacy `openai` module otherwise
+    aclient: Any  # openai.AsyncOpenAI on v1+, None on legacy
+    pools: tuple = ()  # the httpx clients behind them, closed by aclose()
+
+
+@lru_cache(maxsize=1)
+def _sdk() -> _SDK:
+    """
+    OpenAI SDK + clients, built on first use: processes that never call the
+    LLM (workers, tests, CLI) skip the SDK import and the connection pools.
+    """
+    # Try the modern SDK first (v1+)
+    try:
+        import httpx
+        from openai import OpenAI, AsyncOpenAI  # only in v1+
+
+        key = {"api_key": OPENAI_API_KEY} if OPENAI_API_KEY else {}
+        # One pooled connection set per process, so calls skip the TCP/TLS handshake
+        limits = httpx.Limits(max_keepalive_connections=50, max_connections=100)
+        timeout = httpx.Timeout(30.0, connect=5.0)
+        hx = httpx.Client(http2=HTTP2_AVAILABLE, limits=limits, timeout=timeout)
+        ahx = httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=limits, timeout=timeout)
+        # retries are ours (_retry_delay), not the SDK's, so they don't multiply
+        return _SDK(
+            True,
+            OpenAI(http_client=hx, max_retries=0, **key),
+            AsyncOpenAI(http_client=ahx, max_retries=0, **key),
+            (hx, ahx),
+        )
+    except Exception:
+        pass
 
-if not _use_v1:
     # Fall back to legacy 0.28.x
-    import openai as _openai_legacy
+    import openai as legacy
     if OPENAI_API_KEY:
-        _openai_legacy.api_key = OPENAI_API_KEY
+        legacy.api_key = OPENAI_API_KEY
+    return _SDK(False, legacy, None)
+
+
+async def aclose() -> None:
+    """Close the SDK's connection pools (app shutdown); the next call rebuilds them."""
+    if not _sdk.cache_info().currsize:
+        return
+    for pool in _sdk().pools:
+        if hasattr(pool, "aclose"):
+            await pool.aclose()
+        else:
+            pool.close()
+    _sdk.cache_clear()
+
+
+def _cache_key(system: str, user: str, temperature: float,
+               response_format: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    if temperature > _CACHE_MAX_TEMPERATURE:
+        return None
+    fmt = (response_format or {}).get("type", "")
+    return hashlib.sha256(f"{_LLM_MODEL}|{temperature}|{fmt}|{system}|{user}".encode("utf-8")).hexdigest()
+
+
+def clear_llm_cache() -> None:
+    _RESP_CACHE.clear()
 
 
-def _safe_llm(system: str, user: str, temperature: float = 0.2) -> str:
+def _llm_error(e: Exception) -> str:
+    if _DEMO_MODE:
+        return f"(DEMO MODE fallback; LLM error: {e})"
+    return f"(LLM error: {e})"
+
+
+def _retry_delay(e: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying after `e` (0-based attempt), or None to give up."""
+    if attempt + 1 >= _LLM_MAX_ATTEMPTS:
+        return None
+    status = getattr(e, "status_code", None) or getattr(e, "http_status", None)
+    if type(e).__name__ not in _RETRYABLE_ERRORS and status not in _RETRYABLE_STATUS:
+        return None
+    headers = getattr(getattr(e, "response", None), "headers", None) or getattr(e, "headers", None) or {}
+    try:
+        retry_after = float(headers.get("retry-after") or headers.get("Retry-After"))
+        return min(max(retry_after, 0.0), _RETRY_MAX_SECONDS)
+    except (TypeError, ValueError):
+        pass
+    # "full jitter" exponential backoff, so a gathered batch doesn't retry in lockstep
+    ceiling = min(_RETRY_MAX_SECONDS, _RETRY_MIN_SECONDS * 2 ** attempt)
+    return max(_RETRY_MIN_SECONDS, random.uniform(0, ceiling))
+
+
+def _safe_llm(system: str, user: str, temperature: float = 0.2,
+              response_format: Optional[Dict[str, Any]] = None) -> str:
     """
-    Ask the LLM safely. If anything fails, return a graceful fallback string.
-    Works with both OpenAI SDK v1+ and legacy 0.28.x.
+    Ask the LLM safely. Rate limits and transient errors are retried with
+    backoff (up to LLM_MAX_ATTEMPTS); if it still fails, return a graceful
+    fallback string. Works with both OpenAI SDK v1+ and legacy 0.28.x.
+    `response_format` (e.g. {"type": "json_object"}) is only sent on v1+.
     """
     if not OPENAI_API_KEY:
         return "LLM not configured: set OPENAI_API_KEY."
+    key = _cache_key(system, user, temperature, response_format)
+    if key is not None:
+        hit = _RESP_CACHE.get(key)
+        if hit is not None:
+            return hit
 
+    for attempt in range(_LLM_MAX_ATTEMPTS):
+        try:
+            sdk = _sdk()
+            if sdk.use_v1:
+                extra = {"response_format": response_format} if response_format else {}
+                resp = sdk.client.chat.completions.create(
+                    model=_LLM_MODEL,
+                    temperature=temperature,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": user},
+                    ],
+                    **extra,
+                )
+                text = (resp.choices[0].message.content or "").strip()
+            else:
+                resp = sdk.client.ChatCompletion.create(
+                    model=_LLM_MODEL if _LLM_MODEL else "gpt-3.5-turbo",
+                    temperature=temperature,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": user},
+                    ],
+                )
+                text = (resp["choices"][0]["message"]["content"] or "").strip()
+            break
+        except Exception as e:
+            delay = _retry_delay(e, attempt)
+            if delay is None:
+                return _llm_error(e)
+            time.sleep(delay)
+    if key is not None:
+        _RESP_CACHE.set(key, text)
+    return text
+
+
+async def _safe_llm_async(system: str, user: str, temperature: float = 0.2,
+                          response_format: Optional[Dict[str, Any]] = None) -> str:
+    """Async twin of _safe_llm (legacy SDK calls run in a worker thread)."""
+    if not OPENAI_API_KEY:
+        return "LLM not configured: set OPENAI_API_KEY."
     try:
-        if _use_v1:
-            resp = _client_v1.chat.completions.create(
+        sdk = _sdk()
+    except Exception as e:
+        return _llm_error(e)
+    if not sdk.use_v1:
+        return await asyncio.to_thread(_safe_llm, system, user, temperature, response_format)
+    key = _cache_key(system, user, temperature, response_format)
+    if key is not None:
+        hit = _RESP_CACHE.get(key)
+        if hit is not None:
+            return hit
+
+    extra = {"response_format": response_format} if response_format else {}
+    for attempt in range(_LLM_MAX_ATTEMPTS):
+        try:
+            resp = await sdk.aclient.chat.completions.create(
                 model=_LLM_MODEL,
                 temperature=temperature,
                 messages=[
                     {"role": "system", "content": system},
                     {"role": "user", "content": user},
                 ],
+                **extra,
             )
-            return (resp.choices[0].message.content or "").strip()
-        else:
-            resp = _openai_legacy.ChatCompletion.create(
-                model=_LLM_MODEL if _LLM_MODEL else "gpt-3.5-turbo",
-                temperature=temperature,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user},
-                ],
-            )
-            return (resp["choices"][0]["message"]["content"] or "").strip()
-    except Exception as e:
-        if _DEMO_MODE:
-            return f"(DEMO MODE fallback; LLM error: {e})"
-        return f"(LLM error: {e})"
+            text = (resp.choices[0].message.content or "").strip()
+            break
+        except Exception as e:
+            delay = _retry_delay(e, attempt)
+            if delay is None:
+                return _llm_error(e)
+            await asyncio.sleep(delay)
+    if key is not None:
+        _RESP_CACHE.set(key, text)
+    return text
 
 
 def _fmt_amount(v):
@@ -79,215 +252,604 @@ def _fmt_amount(v):
         return str(v)
 
 
-def _parse_iso(ts: Any) -> datetime | None:
+# Only what an analyst (or the model) needs; raw/internal fields just cost tokens
+_TX_LLM_FIELDS = (
+    "tx_id", "chain", "from_addr", "to_addr", "amount", "symbol", "direction",
+    "timestamp", "fee", "category", "risk_score", "risk_flags", "memo",
+)
+
+
+def _slim(tx: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k in _TX_LLM_FIELDS if (v := tx.get(k)) is not None}
+
+
+def _total(values: List[float]) -> float:
+    """Exactly-rounded sum (math.fsum): big and tiny amounts don't swallow each other."""
+    try:
+        return math.fsum(values)
+    except (ValueError, OverflowError):
+        return sum(values, 0.0)  # inf - inf / overflow: same nan/inf a plain sum gives
+
+
+def _to_json(obj: Any, indent: int | None = None) -> str:
+    """Prompt JSON with stable key order, so identical data gives identical prompt bytes."""
+    if ORJSON_AVAILABLE:
+        opts = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=str, option=opts).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, indent=indent, default=str)
+
+
+def _from_json(raw: str | bytes) -> Any:
+    return orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+
+
+def _extract_json(text: str) -> Optional[Dict[str, Any]]:
+    """
+    First top-level {...} object in a model reply, tolerating ```json fences
+    and prose around it. Returns None if nothing parses to a dict.
+    """
+    start = text.find("{")
+    while start != -1:
+        depth, in_str, esc = 0, False, False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_str:
+                if esc:
+                    esc = False
+                elif ch == "\\":
+                    esc = True
+                elif ch == '"':
+                    in_str = False
+            elif ch == '"':
+                in_str = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        obj = _from_json(text[start:i + 1])
+                    except ValueError:
+                        break
+                    return obj if isinstance(obj, dict) else None
+        start = text.find("{", start + 1)
+    return None
+
+
+@lru_cache(maxsize=65536)
+def _parse_iso_str(ts: str) -> datetime | None:
+    # timestamps repeat a lot across rows; datetimes are immutable, so sharing is safe
     try:
-        return datetime.fromisoformat(str(ts))
+        return datetime.fromisoformat(ts)
     except Exception:
         return None
 
 
+def _parse_iso(ts: Any) -> datetime | None:
+    return _parse_iso_str(str(ts))
+
+
 # =========================================================
 # 1) Single-transaction explanation
 # =========================================================
-def explain_tx(tx: Dict[str, Any]) -> str:
-    """
-    Return a natural-language explanation of a single transaction.
-    """
+_EXPLAIN_TX_SYSTEM = (
+    "You are a compliance and risk assistant for crypto transactions. "
+    "Explain the transaction succinctly (5-8 sentences), focusing on risk-relevant details, "
+    "direction, counterparties, and any anomalies. Avoid hedging."
+)
+
+
+def _explain_tx_prompt(tx: Dict[str, Any]) -> tuple[str, str]:
+    """(preface, user prompt) for one transaction."""
     pre = [
         f"Transaction {tx.get('tx_id', '—')} on {tx.get('chain', 'unknown')}:",
         f"  from {tx.get('from_addr', '—')} to {tx.get('to_addr', '—')}",
         f"  amount: {_fmt_amount(tx.get('amount', 0))} {tx.get('symbol', '')} | direction: {tx.get('direction', '—')}",
         f"  timestamp: {tx.get('timestamp', '—')} | fee: {tx.get('fee', '—')}",
     ]
-    preface = "\n".join(pre)
+    user = "Explain this JSON transaction for a compliance analyst:\n" + _to_json(_slim(tx), indent=2)
+    return "\n".join(pre), user
 
-    system = (
-        "You are a compliance and risk assistant for crypto transactions. "
-        "Explain the transaction succinctly (5-8 sentences), focusing on risk-relevant details, "
-        "direction, counterparties, and any anomalies. Avoid hedging."
-    )
-    user = "Explain this JSON transaction for a compliance analyst:\n" + json.dumps(tx, ensure_ascii=False, indent=2)
-    llm = _safe_llm(system, user)
+
+def explain_tx(tx: Dict[str, Any]) -> str:
+    """
+    Return a natural-language explanation of a single transaction.
+    """
+    preface, user = _explain_tx_prompt(tx)
+    llm = _safe_llm(_EXPLAIN_TX_SYSTEM, user)
+    return preface + "\n\n" + llm
+
+
+async def explain_tx_async(tx: Dict[str, Any]) -> str:
+    preface, user = _explain_tx_prompt(tx)
+    llm = await _safe_llm_async(_EXPLAIN_TX_SYSTEM, user)
     return preface + "\n\n" + llm
 
 
 # =========================================================
 # 2) Batch explanation
 # =========================================================
-def explain_batch(txs: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """
-    For a list of tx dicts, return:
-      { items: [ {tx_id, explanation}, ... ], summary: "..." }
-    """
-    items = []
-    for t in txs:
-        text = explain_tx(t)
-        items.append({"tx_id": t.get("tx_id"), "explanation": text})
+_BATCH_SUMMARY_SYSTEM = (
+    "You are a senior compliance analyst. Provide a crisp summary (4-7 sentences), "
+    "calling out categories, suspicious patterns, and high-level risk signals."
+)
 
-    amounts = [float(t.get("amount", 0) or 0) for t in txs if isinstance(t.get("amount", 0), (int, float, str))]
-    risk_scores = [float(t.get("risk_score", 0) or 0) for t in txs]
+
+def _batch_stats(txs: List[Dict[str, Any]]) -> str:
+    # one pass for both sums
+    amounts: List[float] = []
+    risk_sum = 0.0
+    for t in txs:
+        a = t.get("amount", 0)
+        if isinstance(a, (int, float, str)):
+            a = float(a or 0)
+            if not math.isnan(a):
+                amounts.append(a)
+        risk_sum += float(t.get("risk_score", 0) or 0)
+    total_amt = _total(amounts) if amounts else 0
 
     total = len(txs)
-    total_amt = sum(a for a in amounts if not math.isnan(a))
-    avg_risk = round(sum(risk_scores) / len(risk_scores), 3) if risk_scores else 0.0
+    avg_risk = round(risk_sum / total, 3) if total else 0.0
 
-    system = (
-        "You are a senior compliance analyst. Provide a crisp summary (4-7 sentences), "
-        "calling out categories, suspicious patterns, and high-level risk signals."
-    )
-    user = (
+    return (
         f"Batch size: {total}\n"
         f"Total amount (naive sum): {total_amt}\n"
         f"Average risk score (if any): {avg_risk}\n"
-        f"Sample items (trimmed to first 20):\n{json.dumps(txs[:20], ensure_ascii=False, indent=2)}"
     )
-    batch_summary = _safe_llm(system, user)
+
+
+def _batch_summary_prompt(txs: List[Dict[str, Any]]) -> str:
+    return (
+        _batch_stats(txs)
+        + f"Sample items (trimmed to first 20):\n{_to_json([_slim(t) for t in txs[:20]], indent=2)}"
+    )
+
+
+def explain_batch(txs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    For a list of tx dicts, return:
+      { items: [ {tx_id, explanation}, ... ], summary: "..." }
+    Per-tx calls run concurrently (up to LLM_CONCURRENCY); use
+    explain_batch_async from async code.
+    """
+    user = _batch_summary_prompt(txs)
+    with ThreadPoolExecutor(max_workers=_LLM_CONCURRENCY) as pool:
+        summary_future = pool.submit(_safe_llm, _BATCH_SUMMARY_SYSTEM, user)
+        texts = list(pool.map(explain_tx, txs))
+        batch_summary = summary_future.result()
+    items = [{"tx_id": t.get("tx_id"), "explanation": text} for t, text in zip(txs, texts)]
+    return {"items": items, "summary": batch_summary}
+
+
+async def explain_batch_async(txs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """explain_batch with asyncio.gather: wall time ~ slowest call, not the sum."""
+    sem = asyncio.Semaphore(_LLM_CONCURRENCY)
+
+    async def _one(t: Dict[str, Any]) -> str:
+        async with sem:
+            return await explain_tx_async(t)
+
+    async def _summary() -> str:
+        async with sem:
+            return await _safe_llm_async(_BATCH_SUMMARY_SYSTEM, _batch_summary_prompt(txs))
+
+    *texts, batch_summary = await asyncio.gather(*(_one(t) for t in txs), _summary())
+    items = [{"tx_id": t.get("tx_id"), "explanation": text} for t, text in zip(txs, texts)]
     return {"items": items, "summary": batch_summary}
 
 
+_FUSED_SYSTEM = (
+    "You are a senior compliance analyst. For each transaction write a 2-3 sentence explanation "
+    "(risk level, notable patterns, suggested next steps), then a crisp batch summary (4-7 sentences) "
+    'calling out categories, suspicious patterns, and high-level risk signals. Return only JSON: '
+    '{"items": [{"i": <index>, "explanation": "..."}], "summary": "..."}'
+)
+_REDUCE_SYSTEM = (
+    "You are a senior compliance analyst. Merge these partial batch summaries into one crisp summary "
+    "(4-7 sentences), calling out categories, suspicious patterns, and high-level risk signals."
+)
+
+
+async def _explain_chunk_fused(txs: List[Dict[str, Any]], offset: int) -> tuple[List[str], str]:
+    """One call for a chunk: (explanations in tx order, chunk summary)."""
+    payload = [{"i": offset + j, **_slim(t)} for j, t in enumerate(txs)]
+    user = _batch_stats(txs) + "Transactions:\n" + _to_json(payload, indent=2)
+    raw = await _safe_llm_async(_FUSED_SYSTEM, user, response_format={"type": "json_object"})
+    data = _extract_json(raw)
+    if data is None:
+        # not configured / LLM error / unusable reply: surface the text as the summary
+        return [""] * len(txs), raw
+    by_index: Dict[int, str] = {}
+    for item in data.get("items") or []:
+        if isinstance(item, dict):
+            try:
+                by_index[int(item.get("i"))] = str(item.get("explanation") or "")
+            except (TypeError, ValueError):
+                continue
+    texts = [by_index.get(offset + j, "") for j in range(len(txs))]
+    return texts, str(data.get("summary") or "")
+
+
+async def explain_batch_fused(txs: List[Dict[str, Any]], max_inline: int = 20) -> Dict[str, Any]:
+    """
+    explain_batch in 1 call instead of N+1: every chunk of up to `max_inline`
+    txs gets one JSON-mode call returning per-tx explanations plus a summary;
+    with several chunks, one more call merges the chunk summaries (map-reduce).
+    Explanations are shorter than explain_tx's; use explain_batch_async for
+    per-tx detail.
+    """
+    if not txs:
+        return {"items": [], "summary": ""}
+    size = max(1, max_inline)
+    sem = asyncio.Semaphore(_LLM_CONCURRENCY)
+
+    async def _chunk(start: int) -> tuple[List[str], str]:
+        async with sem:
+            return await _explain_chunk_fused(txs[start:start + size], start)
+
+    parts = await asyncio.gather(*(_chunk(i) for i in range(0, len(txs), size)))
+    texts = [text for chunk_texts, _ in parts for text in chunk_texts]
+    if len(parts) == 1:
+        batch_summary = parts[0][1]
+    else:
+        partials = "\n\n".join(f"Part {k + 1}: {summary}" for k, (_, summary) in enumerate(parts))
+        batch_summary = await _safe_llm_async(_REDUCE_SYSTEM, f"Batch size: {len(txs)}\n\n{partials}")
+    items = [{"tx_id": t.get("tx_id"), "explanation": text} for t, text in zip(txs, texts)]
+    return {"items": items, "summary": batch_summary}
+
+
+_BATCH_TERMINAL = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+def explain_batch_bulk(
+    txs: List[Dict[str, Any]],
+    wait: bool = True,
+    poll_seconds: float = 15.0,
+    timeout_seconds: float = 24 * 3600,
+) -> Dict[str, Any]:
+    """
+    explain_batch through the OpenAI Batch API: half the token price, no
+    per-minute ceiling, but turnaround is minutes to hours. For offline
+    reports only. Falls back to the realtime explain_batch when wait=False,
+    when the LLM isn't configured, or on the legacy SDK.
+    """
+    if not wait or not OPENAI_API_KEY or not txs:
+        return explain_batch(txs)
+    try:
+        sdk = _sdk()
+    except Exception:
+        sdk = None
+    if sdk is None or not sdk.use_v1:
+        return explain_batch(txs)
+    client = sdk.client.with_options(max_retries=2)  # plain calls, no _safe_llm loop here
+
+    prompts = [_explain_tx_prompt(t) for t in txs]
+    lines = [
+        _to_json({
+            "custom_id": str(i),  # tx_id may repeat or be missing; index is unique
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": _LLM_MODEL,
+                "temperature": 0.2,
+                "messages": [
+                    {"role": "system", "content": _EXPLAIN_TX_SYSTEM},
+                    {"role": "user", "content": user},
+                ],
+            },
+        })
+        for i, (_, user) in enumerate(prompts)
+    ]
+
+    answers: Dict[str, str] = {}
+    failure = ""
+    try:
+        upload = client.files.create(
+            file=("explain_batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch"
+        )
+        batch = client.batches.create(
+            input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window="24h"
+        )
+        deadline = time.monotonic() + timeout_seconds
+        while batch.status not in _BATCH_TERMINAL and time.monotonic() < deadline:
+            time.sleep(poll_seconds)
+            batch = client.batches.retrieve(batch.id)
+
+        if batch.status not in _BATCH_TERMINAL:
+            # gave up waiting: stop the job so it doesn't keep running (and billing)
+            client.batches.cancel(batch.id)
+            failure = f"batch {batch.id} timed out ({batch.status}); cancelled"
+        elif batch.status != "completed":
+            failure = f"batch {batch.id} {batch.status}"
+        if batch.output_file_id:
+            for line in client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                rec = _from_json(line)
+                body = ((rec.get("response") or {}).get("body")) or {}
+                choices = body.get("choices") or []
+                if choices:
+                    answers[rec["custom_id"]] = (choices[0]["message"].get("content") or "").strip()
+    except Exception as e:
+        failure = str(e)
+
+    summary = _safe_llm(_BATCH_SUMMARY_SYSTEM, _batch_summary_prompt(txs))
+    items = []
+    for i, (t, (preface, _)) in enumerate(zip(txs, prompts)):
+        text = answers.get(str(i))
+        if text is None:
+            text = _llm_error(RuntimeError(failure or "no batch result"))
+        items.append({"tx_id": t.get("tx_id"), "explanation": preface + "\n\n" + text})
+    return {"items": items, "summary": summary}
+
+
 # =========================================================
 # 3) Natural-language filters spec
 # =========================================================
+_ASK_FILTERS_SYSTEM = (
+    "You convert a user's plain-English question into a JSON filter spec for transactions. "
+    "Return **only** JSON with keys: date_from, date_to, min_risk, max_risk, categories, "
+    "include_wallets, exclude_wallets. Omit keys you don't use."
+)
+
+
 def ask_to_filters(question: str) -> Dict[str, Any]:
     """
     Convert a question into a JSON filter spec.
     Keys: date_from, date_to, min_risk, max_risk, categories, include_wallets, exclude_wallets.
     """
-    system = (
-        "You convert a user's plain-English question into a JSON filter spec for transactions. "
-        "Return **only** JSON with keys: date_from, date_to, min_risk, max_risk, categories, "
-        "include_wallets, exclude_wallets. Omit keys you don't use."
-    )
-    user = f"Question: {question}\n\nReturn only JSON, no commentary."
-    raw = _safe_llm(system, user)
-    try:
-        spec = json.loads(raw)
-        if not isinstance(spec, dict):
-            raise ValueError("Spec was not a dict")
-        return spec
-    except Exception:
-        return {}
+    # static instruction first, the question last (stable prompt prefix)
+    user = f"Return only JSON, no commentary.\n\nQuestion: {question}"
+    raw = _safe_llm(_ASK_FILTERS_SYSTEM, user, response_format={"type": "json_object"})
+    return _extract_json(raw) or {}
 
 
 # =========================================================
-# 4) Apply filters to local rows
+# 4) Column view + filters over local rows
 # =========================================================
-def apply_filters(rows: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
-    if not rows:
-        return []
+def _numeric(values: List[Any]) -> np.ndarray:
+    try:
+        # all numbers / numeric strings / None (-> nan): numpy converts directly
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=float)
 
-    df = spec  # shorthand
-    date_from = _parse_iso(df.get("date_from")) if df.get("date_from") else None
-    date_to   = _parse_iso(df.get("date_to"))   if df.get("date_to")   else None
-    min_risk  = float(df.get("min_risk", 0)) if df.get("min_risk") is not None else None
-    max_risk  = float(df.get("max_risk", 1)) if df.get("max_risk") is not None else None
-    cats      = set([str(c).lower() for c in (df.get("categories") or [])])
-    inc_w     = set([str(w) for w in (df.get("include_wallets") or [])])
-    exc_w     = set([str(w) for w in (df.get("exclude_wallets") or [])])
-
-    out = []
-    for r in rows:
-        ts = _parse_iso(r.get("timestamp"))
-        if date_from and (not ts or ts < date_from):
-            continue
-        if date_to and (not ts or ts > date_to):
-            continue
-
-        risk = None
-        try:
-            risk = float(r.get("risk_score")) if r.get("risk_score") is not None else None
-        except Exception:
-            risk = None
 
-        if min_risk is not None and (risk is None or risk < min_risk):
-            continue
-        if max_risk is not None and (risk is None or risk > max_risk):
-            continue
+def _numeric_column(rows: List[Dict[str, Any]], field: str) -> np.ndarray:
+    return _numeric([r.get(field) for r in rows])
+
 
-        cat = str(r.get("category", "unknown")).lower()
-        if cats and cat not in cats:
-            continue
+def _blank_column(rows: List[Dict[str, Any]], field: str) -> np.ndarray:
+    # None / "" / 0: KPI math counts these as 0 rather than dropping them
+    return np.fromiter((not r.get(field, 0) for r in rows), dtype=bool, count=len(rows))
 
-        from_w = str(r.get("from_addr", ""))
-        to_w = str(r.get("to_addr", ""))
 
-        if inc_w and not (from_w in inc_w or to_w in inc_w):
-            continue
-        if exc_w and (from_w in exc_w or to_w in exc_w):
-            continue
+def _category_column(rows: List[Dict[str, Any]]) -> np.ndarray:
+    values = [r.get("category", "unknown") for r in rows]
+    return np.fromiter(values, dtype=object, count=len(values))
 
-        out.append(r)
 
-    return out
+# Columns the filter and the KPI helpers share. Wallets and timestamps are
+# only read by one filter each, so those checks read the dicts directly.
+_COLUMNS = {
+    "risk_score": lambda rows: _numeric_column(rows, "risk_score"),
+    "risk_score_blank": lambda rows: _blank_column(rows, "risk_score"),
+    "amount": lambda rows: _numeric_column(rows, "amount"),
+    "amount_blank": lambda rows: _blank_column(rows, "amount"),
+    "category": _category_column,
+}
+
+
+class RowsView:
+    """
+    Column (structure-of-arrays) view over tx row dicts. Each column is pulled
+    out of the dicts once, on first use; take() carries the built columns over
+    to the subset, so filter_rows -> explain_selection / summarize_rows in one
+    request parse every field once. Iterates, indexes and slices like the
+    underlying list, so it can stand in for `rows` (slices give plain dicts).
+    """
+
+    __slots__ = ("raw", "_cols")
+
+    def __init__(self, rows: List[Dict[str, Any]]) -> None:
+        self.raw = rows if isinstance(rows, list) else list(rows)
+        self._cols: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_rows(cls, rows: "List[Dict[str, Any]] | RowsView") -> "RowsView":
+        return rows if isinstance(rows, RowsView) else cls(rows)
+
+    def col(self, name: str) -> np.ndarray:
+        arr = self._cols.get(name)
+        if arr is None:
+            arr = self._cols[name] = _COLUMNS[name](self.raw)
+        return arr
+
+    def take(self, mask: np.ndarray) -> "RowsView":
+        if mask.all():
+            return self
+        sub = RowsView(list(compress(self.raw, mask.tolist())))
+        sub._cols = {name: arr[mask] for name, arr in self._cols.items()}
+        return sub
+
+    def risks(self) -> np.ndarray:
+        """Risk scores for KPIs: blank counts as 0, unparseable values are dropped."""
+        vals = np.where(self.col("risk_score_blank"), 0.0, self.col("risk_score"))
+        return vals[~np.isnan(vals)]
+
+    def amounts(self) -> np.ndarray:
+        """Amounts for totals: blank counts as 0, unparseable/NaN values are dropped."""
+        vals = np.where(self.col("amount_blank"), 0.0, self.col("amount"))
+        return vals[~np.isnan(vals)]
+
+    def categories(self) -> Counter:
+        """Category counts (blank -> "unknown"), in first-seen order."""
+        out: Counter = Counter()
+        for c, k in Counter(self.col("category").tolist()).items():
+            out[c or "unknown"] += k
+        return out
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    def __getitem__(self, key):
+        return self.raw[key]
+
+
+def _date_mask(ts: List[str], date_from: datetime | None, date_to: datetime | None) -> np.ndarray:
+    try:
+        parsed = pd.to_datetime(pd.Series(ts, dtype=object), errors="coerce", format="ISO8601")
+        mask = parsed.notna().to_numpy()
+        if date_from:
+            mask = mask & (parsed >= date_from).to_numpy()
+        if date_to:
+            mask = mask & (parsed <= date_to).to_numpy()
+        return mask
+    except (TypeError, ValueError):
+        # mixed offsets / naive-vs-aware: fall back to the per-row stdlib parse
+        return np.fromiter((_in_range(_parse_iso_str(x), date_from, date_to) for x in ts),
+                           dtype=bool, count=len(ts))
+
+
+def _in_range(t: datetime | None, date_from: datetime | None, date_to: datetime | None) -> bool:
+    if t is None:
+        return False
+    try:
+        return (not date_from or t >= date_from) and (not date_to or t <= date_to)
+    except TypeError:  # aware vs naive: not comparable, treat as out of range
+        return False
+
+
+def _risk_mask(risk: np.ndarray, min_risk: float | None, max_risk: float | None) -> np.ndarray:
+    mask = ~np.isnan(risk)
+    if min_risk is not None:
+        mask = mask & (risk >= min_risk)
+    if max_risk is not None:
+        mask = mask & (risk <= max_risk)
+    return mask
+
+
+def _category_mask(categories: np.ndarray, cats: frozenset) -> np.ndarray:
+    # few distinct categories: casefold each one once, not once per row
+    values = categories.tolist()
+    try:
+        hit = {c: str(c).casefold() in cats for c in dict.fromkeys(values)}
+    except TypeError:  # unhashable value somewhere
+        return np.fromiter((str(c).casefold() in cats for c in values), dtype=bool, count=len(values))
+    return np.fromiter(map(hit.__getitem__, values), dtype=bool, count=len(values))
+
+
+def _wallet_hits(view: RowsView, wallets: frozenset) -> np.ndarray:
+    return np.fromiter(
+        (str(r.get("from_addr", "")) in wallets or str(r.get("to_addr", "")) in wallets for r in view.raw),
+        dtype=bool, count=len(view),
+    )
+
+
+def filter_rows(rows: "List[Dict[str, Any]] | RowsView", spec: Dict[str, Any]) -> RowsView:
+    """apply_filters over a RowsView; the result keeps the parsed columns for the next step."""
+    view = RowsView.from_rows(rows)
+    if not len(view):
+        return view
+
+    df = spec  # shorthand
+    raw_from, raw_to = df.get("date_from"), df.get("date_to")
+    raw_min, raw_max = df.get("min_risk"), df.get("max_risk")
+    date_from = _parse_iso(raw_from) if raw_from else None
+    date_to   = _parse_iso(raw_to)   if raw_to   else None
+    min_risk  = float(raw_min) if raw_min is not None else None
+    max_risk  = float(raw_max) if raw_max is not None else None
+    cats      = frozenset(str(c).casefold() for c in (df.get("categories") or ()))
+    inc_w     = frozenset(str(w) for w in (df.get("include_wallets") or ()))
+    exc_w     = frozenset(str(w) for w in (df.get("exclude_wallets") or ()))
+
+    # One mask per active filter, each over the rows that survived the previous
+    # ones: cheap set-membership checks first, the timestamp parse (the most
+    # expensive step) last. Columns built along the way stay on the result.
+    checks = []
+    if exc_w:
+        checks.append(lambda v: ~_wallet_hits(v, exc_w))
+    if inc_w:
+        checks.append(lambda v: _wallet_hits(v, inc_w))
+    if cats:
+        checks.append(lambda v: _category_mask(v.col("category"), cats))
+    if min_risk is not None or max_risk is not None:
+        checks.append(lambda v: _risk_mask(v.col("risk_score"), min_risk, max_risk))
+    if date_from or date_to:
+        checks.append(lambda v: _date_mask([str(r.get("timestamp")) for r in v.raw], date_from, date_to))
+
+    for check in checks:
+        if not len(view):
+            break
+        view = view.take(check(view))
+    return view
+
+
+def apply_filters(rows: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if not rows:
+        return []
+    return filter_rows(rows, spec).raw
 
 
 # =========================================================
 # 5) Explain a filtered selection
 # =========================================================
-def explain_selection(question: str, rows: List[Dict[str, Any]]) -> str:
-    n = len(rows)
+_SELECTION_SYSTEM = (
+    "You are a compliance analyst. Provide a concise, direct answer to the user's question "
+    "grounded in the provided selection. 3-6 sentences, call out patterns & risks."
+)
+
+
+def explain_selection(question: str, rows: "List[Dict[str, Any]] | RowsView") -> str:
+    view = RowsView.from_rows(rows)
+    n = len(view)
     if n == 0:
         return "No rows matched the criteria."
 
-    risks = [float(r.get("risk_score", 0) or 0) for r in rows]
-    avg_risk = round(sum(risks) / len(risks), 3) if risks else 0.0
-    cats: Dict[str, int] = {}
-    for r in rows:
-        c = r.get("category") or "unknown"
-        cats[c] = cats.get(c, 0) + 1
+    risks = view.risks()
+    avg_risk = round(sum(risks.tolist()) / len(risks), 3) if len(risks) else 0.0
 
-    system = (
-        "You are a compliance analyst. Provide a concise, direct answer to the user's question "
-        "grounded in the provided selection. 3-6 sentences, call out patterns & risks."
-    )
     user = (
         f"Question: {question}\n"
-        f"Count: {n}\nAverage risk: {avg_risk}\nCategories: {json.dumps(cats, ensure_ascii=False)}\n"
-        f"Sample (first 30):\n{json.dumps(rows[:30], ensure_ascii=False, indent=2)}"
+        f"Count: {n}\nAverage risk: {avg_risk}\nCategories: {_to_json(view.categories())}\n"
+        f"Sample (first 30):\n{_to_json([_slim(r) for r in view.raw[:30]], indent=2)}"
     )
-    return _safe_llm(system, user)
+    return _safe_llm(_SELECTION_SYSTEM, user)
 
 
 # =========================================================
 # 6) Summarize rows for dashboard
 # =========================================================
-def summarize_rows(rows: List[Dict[str, Any]], title: str = "Summary") -> Dict[str, Any]:
-    n = len(rows)
+_SUMMARY_SYSTEM = (
+    "You are a seasoned AML analyst. Provide a compact commentary (4-6 sentences) on the KPIs and patterns, "
+    "flagging noteworthy risks and possible next steps."
+)
+
+
+def summarize_rows(rows: "List[Dict[str, Any]] | RowsView", title: str = "Summary") -> Dict[str, Any]:
+    view = RowsView.from_rows(rows)
+    n = len(view)
     if n == 0:
         return {"title": title, "count": 0, "kpis": {}, "commentary": "No recent activity."}
 
-    amounts = []
-    risks = []
-    cats: Dict[str, int] = {}
-    for r in rows:
-        try:
-            amounts.append(float(r.get("amount", 0) or 0))
-        except Exception:
-            pass
-        try:
-            risks.append(float(r.get("risk_score", 0) or 0))
-        except Exception:
-            pass
-        c = r.get("category") or "unknown"
-        cats[c] = cats.get(c, 0) + 1
-
-    total_amt = sum(amounts) if amounts else 0.0
-    avg_risk = round(sum(risks) / len(risks), 3) if risks else 0.0
-    p95_risk = round(stats.quantiles(risks, n=20)[-1], 3) if len(risks) >= 20 else (max(risks) if risks else 0.0)
+    risks = view.risks()
+    # "weibull" is statistics.quantiles' default (exclusive) method; below 20
+    # samples it lands on the max, so no small-n special case is needed
+    avg_risk = round(sum(risks.tolist()) / len(risks), 3) if len(risks) else 0.0
+    p95_risk = round(float(np.quantile(risks, 0.95, method="weibull")), 3) if len(risks) else 0.0
 
     kpis = {
         "transactions": n,
-        "total_amount": total_amt,
+        "total_amount": _total(view.amounts().tolist()),
         "avg_risk": avg_risk,
         "p95_risk": p95_risk,
-        "top_categories": sorted(cats.items(), key=lambda kv: kv[1], reverse=True)[:5],
+        "top_categories": view.categories().most_common(5),
     }
 
-    system = (
-        "You are a seasoned AML analyst. Provide a compact commentary (4-6 sentences) on the KPIs and patterns, "
-        "flagging noteworthy risks and possible next steps."
-    )
-    user = f"Title: {title}\nKPIs: {json.dumps(kpis, ensure_ascii=False)}\n"
-    commentary = _safe_llm(system, user)
+    user = f"Title: {title}\nKPIs: {_to_json(kpis)}\n"
+    commentary = _safe_llm(_SUMMARY_SYSTEM, user)
 
     return {"title": title, "count": n, "kpis": kpis, "commentary": commentary}
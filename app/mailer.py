@@ -1,22 +1,70 @@
 # app/mailer.py
+"""
+The app's one SendGrid client: alert mail (main.py) and admin test mail
+(admin.py) both go through here, over pooled keep-alive connections.
+"""
 import os
-import sendgrid
-from sendgrid.helpers.mail import Mail
+from functools import lru_cache
+from typing import Optional
 
-SENDGRID_KEY = os.getenv("SENDGRID_API_KEY")
+import httpx
+
+SENDGRID_KEY = os.getenv("SENDGRID_API_KEY", "").strip()
 FROM_EMAIL = os.getenv("SENDGRID_FROM")
 FROM_NAME = os.getenv("SENDGRID_NAME", "Klerno Labs")
 
-sg = sendgrid.SendGridAPIClient(SENDGRID_KEY)
-
-def send_email(to_email: str, subject: str, content: str):
-    """Send a simple email using SendGrid."""
-    message = Mail(
-        from_email=(FROM_EMAIL, FROM_NAME),
-        to_emails=to_email,
-        subject=subject,
-        plain_text_content=content,
-        html_content=f"<p>{content}</p>",
-    )
-    response = sg.send(message)
-    return response.status_code
+# SendGrid v3 REST endpoint; same request the SDK makes, minus the blocking client
+SENDGRID_URL = "https://api.sendgrid.com/v3/mail/send"
+
+# a batch of alerts shares TCP+TLS; SendGrid rate-limits bursts anyway
+_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=20)
+
+
+@lru_cache(maxsize=1)
+def _client() -> httpx.Client:
+    """Sync sends (alert threads, scripts, worker) share one pool."""
+    return httpx.Client(timeout=10, limits=_LIMITS)
+
+
+@lru_cache(maxsize=1)
+def _aclient() -> httpx.AsyncClient:
+    """Created on first use so it binds to the running event loop."""
+    return httpx.AsyncClient(timeout=10, limits=_LIMITS)
+
+
+async def aclose() -> None:
+    """Close both pools (app shutdown); a later send opens fresh ones."""
+    if _client.cache_info().currsize:
+        _client().close()
+        _client.cache_clear()
+    if _aclient.cache_info().currsize:
+        await _aclient().aclose()
+        _aclient.cache_clear()
+
+
+def _request(to_email: str, subject: str, content: str, from_email: Optional[str] = None) -> dict:
+    return {
+        "headers": {"Authorization": f"Bearer {SENDGRID_KEY}"},
+        "json": {
+            "personalizations": [{"to": [{"email": to_email}]}],
+            "from": {"email": from_email or FROM_EMAIL, "name": FROM_NAME},
+            "subject": subject,
+            "content": [
+                {"type": "text/plain", "value": content},
+                {"type": "text/html", "value": f"<p>{content}</p>"},
+            ],
+        },
+    }
+
+
+async def send_email_async(to_email: str, subject: str, content: str,
+                           from_email: Optional[str] = None) -> int:
+    """Send an email using SendGrid without blocking the event loop."""
+    resp = await _aclient().post(SENDGRID_URL, **_request(to_email, subject, content, from_email))
+    return resp.status_code
+
+
+def send_email(to_email: str, subject: str, content: str, from_email: Optional[str] = None) -> int:
+    """Send an email using SendGrid (blocking; use send_email_async in handlers)."""
+    resp = _client().post(SENDGRID_URL, **_request(to_email, subject, content, from_email))
+    return resp.status_code
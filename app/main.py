@@ -2,13 +2,16 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 from io import StringIO
-from typing import List, Dict, Any, Optional, Callable, Awaitable, Tuple
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Tuple, Iterable, Iterator
 
 import os
+import multiprocessing
 import hmac
 import secrets
 import pandas as pd
-from dataclasses import asdict, is_dataclass, fields as dc_fields
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import MISSING, asdict, is_dataclass, fields as dc_fields
 
 from fastapi import (
     FastAPI,
@@ -20,7 +23,7 @@ from fastapi import (
     Depends,
     Form,
     WebSocket,
-    Response,
+    Query,
 )
 from fastapi.responses import (
     StreamingResponse,
@@ -30,57 +33,71 @@ from fastapi.responses import (
 )
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, TypeAdapter
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.gzip import GZipMiddleware
 
 # Fast JSON (fallback to default if ORJSON not installed)
+# ORJSONResponse imports fine without orjson and only fails at render, so check orjson itself
 try:
-    from fastapi.responses import ORJSONResponse as FastJSON
-    DEFAULT_RESP_CLS = FastJSON
+    import orjson
+    ORJSON_AVAILABLE = callable(getattr(orjson, "dumps", None))
 except Exception:
+    ORJSON_AVAILABLE = False
+
+if ORJSON_AVAILABLE:
+    from fastapi.responses import ORJSONResponse as FastJSON
+else:
     FastJSON = JSONResponse
-    DEFAULT_RESP_CLS = JSONResponse
+DEFAULT_RESP_CLS = FastJSON
 
 # NEW: for live push hub
 import asyncio, json
 from functools import lru_cache
 
-from . import store
+from . import cache, llm, mailer, store
 from .models import Transaction, TaggedTransaction, ReportRequest
-from .guardian import score_risk
-from .compliance import tag_category
+from .guardian import score_risk, score_risk_df
+from .hardening import new_request_id
+from .cache import SCORE_CACHE, TTLCache
+from .compliance import tag_category, tag_category_df
 from .reporter import csv_export, summary
-from .integrations.xrp import xrpl_json_to_transactions, fetch_account_tx
+from .integrations import xrp
+from .integrations.xrp import xrpl_json_to_frame, fetch_account_tx_async
 from .security import enforce_api_key, expected_api_key
 from .security_session import hash_pw, verify_pw, issue_jwt
+from .settings import get_settings
 
 # Auth/Paywall routers
 from . import auth as auth_router
 from . import paywall_hooks as paywall_hooks
 from .deps import require_paid_or_admin, require_user
 from .routes.analyze_tags import router as analyze_tags_router
-from .admin import router as admin_router  # admin dashboard
+from .admin import STATS_CACHE_PREFIX, router as admin_router  # admin dashboard
 
 # ---------- Optional LLM helpers ----------
 try:
     from .llm import (
-        explain_tx,
-        explain_batch,
+        explain_tx_async,
+        explain_batch_async,
+        explain_batch_fused,
         ask_to_filters,
         explain_selection,
         summarize_rows,
         apply_filters as _llm_apply_filters,  # optional
+        filter_rows as _llm_filter_rows,  # optional
     )
 except ImportError:
     from .llm import (
-        explain_tx,
-        explain_batch,
+        explain_tx_async,
+        explain_batch_async,
+        explain_batch_fused,
         ask_to_filters,
         explain_selection,
         summarize_rows,
     )
     _llm_apply_filters = None
+    _llm_filter_rows = None
 
 
 def _apply_filters_safe(rows: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -124,6 +141,201 @@ def _dump(obj: Any) -> Dict[str, Any]:
     except Exception:
         return {"value": obj}
 
+_TAGGED_LIST = TypeAdapter(List[TaggedTransaction])
+
+def _fields(obj: Any) -> Dict[str, Any]:
+    """Shallow _dump: dataclass fields are flat here, so skip asdict()'s recursive deepcopy."""
+    if is_dataclass(obj) and hasattr(obj, "__dict__"):
+        return dict(vars(obj))
+    return _dump(obj)
+
+# Opt-in: SCORE_WORKERS>1 scores large batches in chunks across worker processes
+# (rows are independent). The default keeps everything in-process; the scorers are
+# already column-wise, and every server worker would otherwise grow its own pool.
+SCORE_WORKERS = max(1, int(os.getenv("SCORE_WORKERS", "1")))
+SCORE_PARALLEL_MIN_ROWS = max(1, int(os.getenv("SCORE_PARALLEL_MIN_ROWS", "50000")))
+# only what score_risk_df / tag_category_df read, so chunks pickle small
+_SCORE_COLUMNS = ("memo", "amount", "fee", "direction", "is_internal", "tags")
+
+def _score_chunk(df: pd.DataFrame) -> Tuple[List[float], List[List[str]], List[str]]:
+    scores, flags = score_risk_df(df)
+    return scores.tolist(), flags.tolist(), tag_category_df(df).tolist()
+
+@lru_cache(maxsize=1)
+def _score_pool() -> ProcessPoolExecutor:
+    """
+    Created on first large batch and reused; worker start-up is too slow to pay per request.
+    forkserver, not fork: forking a threaded server copies locks other threads hold.
+    """
+    return ProcessPoolExecutor(max_workers=SCORE_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+
+def _shutdown_score_pool() -> None:
+    if _score_pool.cache_info().currsize:
+        _score_pool().shutdown(cancel_futures=True)
+        _score_pool.cache_clear()
+
+def _score_frame(df: pd.DataFrame) -> Tuple[List[float], List[List[str]], List[str]]:
+    n = len(df)
+    if SCORE_WORKERS < 2 or n < SCORE_PARALLEL_MIN_ROWS:
+        return _score_chunk(df)
+    df = df[[c for c in _SCORE_COLUMNS if c in df.columns]]
+    step = -(-n // SCORE_WORKERS)
+    scores: List[float] = []
+    flags: List[List[str]] = []
+    categories: List[str] = []
+    chunks = [df.iloc[i:i + step] for i in range(0, n, step)]
+    pool = _score_pool()
+    # the scorers by reference, so workers import guardian/compliance rather than this module
+    risk = pool.map(score_risk_df, chunks)
+    cats = pool.map(tag_category_df, chunks)
+    for (s, f), c in zip(risk, cats):
+        scores += s.tolist()
+        flags += f.tolist()
+        categories += c.tolist()
+    return scores, flags, categories
+
+def _score_key(d: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+    """Every field the scorers read, so equal keys always score the same; None if unhashable."""
+    tags = d.get("tags")
+    key = (d.get("memo"), d.get("amount"), d.get("fee"), d.get("direction"),
+           d.get("is_internal"), tuple(tags) if tags else ())
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+def _score_one(tx: Any) -> Tuple[float, List[str], str]:
+    """score_risk + tag_category for a single tx, through the same cache as the batch paths."""
+    key = _score_key(_fields(tx))
+    hit = None if key is None else SCORE_CACHE.get(key)
+    if hit is None:
+        risk, flags = score_risk(tx)
+        hit = (risk, tuple(flags), tag_category(tx))
+        if key is not None:
+            SCORE_CACHE.set(key, hit)
+    risk, flags, category = hit
+    return risk, list(flags), category
+
+def _tag_all(txs: List[Any]) -> List[TaggedTransaction]:
+    """score_risk + tag_category for a whole batch: one column-wise pass each, not one call per tx."""
+    if not txs:
+        return []
+    return _tag_records([_fields(tx) for tx in txs])
+
+def _tag_frame(df: pd.DataFrame) -> List[TaggedTransaction]:
+    """_tag_all for rows already in columns (Transaction field names); scores straight off the frame."""
+    if df.empty:
+        return []
+    df = df.reset_index(drop=True)
+    # zip over tolist() columns: several times faster than to_dict("records"), same Python values
+    names = list(df.columns)
+    dumped = [dict(zip(names, row)) for row in zip(*(df[c].tolist() for c in names))]
+    return _tag_records(dumped, df)
+
+def _tag_records(dumped: List[Dict[str, Any]], df: Optional[pd.DataFrame] = None) -> List[TaggedTransaction]:
+    keys = [_score_key(d) for d in dumped]
+    results = [None if k is None else SCORE_CACHE.get(k) for k in keys]
+    misses = [i for i, r in enumerate(results) if r is None]
+    if misses:
+        if df is not None:
+            df = df.iloc[misses].reset_index(drop=True)
+        else:
+            df = pd.DataFrame([dumped[i] for i in misses], index=pd.RangeIndex(len(misses)))
+        for i, scored in zip(misses, zip(*_score_frame(df))):
+            results[i] = scored
+            if keys[i] is not None:
+                SCORE_CACHE.set(keys[i], scored)
+    for d, (risk, fl, cat) in zip(dumped, results):
+        d["score"] = risk
+        d["flags"] = list(fl)
+        d["category"] = cat
+    # one validation call for the batch instead of a model __init__ per tx
+    return _TAGGED_LIST.validate_python(dumped)
+
+def _dump_tagged(tagged: List[TaggedTransaction]) -> List[Dict[str, Any]]:
+    """[t.model_dump() for t in tagged] in a single serializer call."""
+    return _TAGGED_LIST.dump_python(tagged)
+
+def _tag_xrpl(account: str, raw: List[Dict[str, Any]]) -> List[TaggedTransaction]:
+    return _tag_frame(xrpl_json_to_frame(account, raw))
+
+def _save_tagged_items(tagged: List[TaggedTransaction]) -> List[Dict[str, Any]]:
+    """
+    Dump + DB fields (risk_score/risk_flags/risk_bucket) per tx, written in one transaction.
+    Blocking: async routes call it through asyncio.to_thread.
+    """
+    items = _dump_tagged(tagged)
+    for d in items:
+        d["risk_score"] = d.get("score")
+        d["risk_flags"] = d.get("flags")
+        d["risk_bucket"] = _risk_bucket(d.get("risk_score", 0))
+    store.save_tagged_many(items)
+    return items
+
+@lru_cache(maxsize=4)
+def _load_csv(path: str, mtime: float) -> pd.DataFrame:
+    """Parsed CSV per (path, mtime); a changed file gets a new key, so edits are picked up."""
+    return pd.read_csv(path)
+
+# /analyze/sample column types, applied by the CSV parser rather than per-column passes afterwards
+SAMPLE_TEXT_COLS = ("memo", "notes", "symbol", "direction", "chain", "tx_id", "from_addr", "to_addr")
+SAMPLE_NUMERIC_COLS = ("amount", "fee", "risk_score")
+SAMPLE_DTYPES = {**{c: str for c in SAMPLE_TEXT_COLS}, **{c: "float64" for c in SAMPLE_NUMERIC_COLS}}
+
+@lru_cache(maxsize=4)
+def _load_sample_typed(path: str, mtime: float) -> pd.DataFrame:
+    """Typed parse per (path, mtime): blank text -> "", blank numbers -> NaN, ISO timestamp strings."""
+    df = pd.read_csv(
+        path,
+        dtype=SAMPLE_DTYPES,
+        keep_default_na=False,
+        na_values={c: [""] for c in SAMPLE_NUMERIC_COLS + ("timestamp",)},
+    )
+    if "timestamp" in df.columns:
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce").dt.strftime("%Y-%m-%dT%H:%M:%S")
+    return df
+
+def _read_sample_typed(path: Optional[str] = None) -> pd.DataFrame:
+    """Cached typed sample; read-only for callers (no copy)."""
+    path = path or os.path.join(BASE_DIR, "..", "data", "sample_transactions.csv")
+    return _load_sample_typed(path, os.stat(path).st_mtime)
+
+@lru_cache(maxsize=4)
+def _load_sample_dated(path: str, mtime: float) -> pd.DataFrame:
+    """/report/csv view of the sample per (path, mtime): datetime64 timestamps, address columns present."""
+    df = _load_csv(path, mtime).copy()
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    for col in ("from_addr", "to_addr"):
+        if col not in df.columns:
+            df[col] = ""
+    return df
+
+def _read_sample_dated(path: Optional[str] = None) -> pd.DataFrame:
+    """Cached dated sample; read-only for callers (filter into new frames, don't assign columns)."""
+    path = path or os.path.join(BASE_DIR, "..", "data", "sample_transactions.csv")
+    return _load_sample_dated(path, os.stat(path).st_mtime)
+
+# Transaction's field names, computed once rather than per request
+TX_FIELDS = frozenset(f.name for f in dc_fields(Transaction))
+
+def _tx_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rows as Transaction fields for _tag_frame: NaN/NaT -> None, absent fields get the
+    dataclass defaults. Same values Transaction(**row) would hold, without the objects.
+    """
+    cols = [c for c in df.columns if c in TX_FIELDS]
+    sub = df[cols].astype(object)
+    sub = sub.where(sub.notna(), None)
+    for f in dc_fields(Transaction):
+        if f.name in sub.columns:
+            continue
+        if f.default_factory is not MISSING:
+            sub[f.name] = pd.Series([f.default_factory() for _ in range(len(sub))], index=sub.index, dtype=object)
+        else:
+            sub[f.name] = pd.Series([f.default] * len(sub), index=sub.index, dtype=object)
+    return sub
+
 # ---- helpers
 def _safe_dt(x) -> datetime:
     try:
@@ -156,6 +368,27 @@ def _row_score(r: Dict[str, Any]) -> float:
 REQ_ID_HEADER = "X-Request-ID"
 CSRF_COOKIE = "csrf_token"
 CSRF_HEADER = "X-CSRF-Token"
+_UNSAFE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+# UPDATED CSP: allow jsDelivr for Bootstrap & Chart.js
+_CSP = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+    "style-src  'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+    "img-src 'self' data:; "
+    "font-src 'self' data: https://cdn.jsdelivr.net; "
+    "connect-src 'self' ws: wss:; "
+    "object-src 'none'; base-uri 'self'; frame-ancestors 'none'"
+)
+# Built once at import; iterated per response
+_SECURITY_HEADERS = (
+    ("Content-Security-Policy", _CSP),
+    ("X-Content-Type-Options", "nosniff"),
+    ("X-Frame-Options", "DENY"),
+    ("Referrer-Policy", "strict-origin-when-cross-origin"),
+    ("Permissions-Policy", "camera=(), microphone=(), geolocation=()"),
+)
+_HSTS_VALUE = "max-age=31536000; includeSubDomains; preload"
 
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     def __init__(self, app):
@@ -164,28 +397,16 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
 
     async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[HTMLResponse]]):
         resp = await call_next(request)
-        # UPDATED CSP: allow jsDelivr for Bootstrap & Chart.js
-        csp = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-            "style-src  'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-            "img-src 'self' data:; "
-            "font-src 'self' data: https://cdn.jsdelivr.net; "
-            "connect-src 'self' ws: wss:; "
-            "object-src 'none'; base-uri 'self'; frame-ancestors 'none'"
-        )
-        resp.headers.setdefault("Content-Security-Policy", csp)
-        resp.headers.setdefault("X-Content-Type-Options", "nosniff")
-        resp.headers.setdefault("X-Frame-Options", "DENY")
-        resp.headers.setdefault("Referrer-Policy", "strict-origin-when-cross-origin")
-        resp.headers.setdefault("Permissions-Policy", "camera=(), microphone=(), geolocation=()")
+        h = resp.headers
+        for k, v in _SECURITY_HEADERS:
+            h.setdefault(k, v)
         if self.enable_hsts and request.url.scheme == "https":
-            resp.headers.setdefault("Strict-Transport-Security", "max-age=31536000; includeSubDomains; preload")
+            h.setdefault("Strict-Transport-Security", _HSTS_VALUE)
         return resp
 
 class RequestIDMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
-        rid = request.headers.get(REQ_ID_HEADER) or secrets.token_hex(8)
+        rid = request.headers.get(REQ_ID_HEADER) or new_request_id()
         request.state.request_id = rid
         resp = await call_next(request)
         resp.headers.setdefault(REQ_ID_HEADER, rid)
@@ -208,7 +429,7 @@ def verify_csrf(request: Request):
         raise HTTPException(status_code=403, detail="Bad CSRF token")
 
 async def csrf_protect_ui(request: Request):
-    if request.method in ("POST", "PUT", "PATCH", "DELETE"):
+    if request.method in _UNSAFE_METHODS:
         verify_csrf(request)
     return True
 
@@ -216,9 +437,19 @@ async def csrf_protect_ui(request: Request):
 # =========================
 # FastAPI app + templates
 # =========================
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    yield
+    # per-process pools, built lazily; released here instead of at interpreter exit
+    _shutdown_score_pool()
+    await mailer.aclose()
+    await llm.aclose()
+    await xrp.aclose()
+
 app = FastAPI(
     title="Klerno Labs API (MVP) — XRPL First",
     default_response_class=DEFAULT_RESP_CLS,
+    lifespan=_lifespan,
 )
 app.add_middleware(RequestIDMiddleware)
 app.add_middleware(SecurityHeadersMiddleware)
@@ -234,37 +465,11 @@ templates.env.globals["url_path_for"] = app.url_path_for
 # Config flags for UI auth redirects
 ADMIN_EMAIL = (os.getenv("ADMIN_EMAIL") or "").strip().lower()
 DEMO_MODE = os.getenv("DEMO_MODE", "false").lower() == "true"
+# parsed once (settings read env at import); alert/metrics paths use it per request
+RISK_THRESHOLD = get_settings().risk_threshold
 
-# ---- Session cookie config
-SESSION_COOKIE = os.getenv("SESSION_COOKIE_NAME", "session")
-COOKIE_SECURE_MODE = os.getenv("COOKIE_SECURE", "auto").lower()  # "auto" | "true" | "false"
-COOKIE_SAMESITE = os.getenv("COOKIE_SAMESITE", "lax").lower()   # "lax" | "strict" | "none"
-
-def _is_secure_request(request: Request) -> bool:
-    xf = (request.headers.get("x-forwarded-proto") or "").lower()
-    if xf:
-        return "https" in xf
-    return request.url.scheme == "https"
-
-def _cookie_kwargs(request: Request) -> Dict[str, Any]:
-    if COOKIE_SECURE_MODE in ("true", "1", "yes"):
-        secure = True
-    elif COOKIE_SECURE_MODE in ("false", "0", "no"):
-        secure = False
-    else:
-        secure = _is_secure_request(request)
-
-    samesite = COOKIE_SAMESITE if COOKIE_SAMESITE in ("lax", "strict", "none") else "lax"
-    if samesite == "none" and not secure:
-        secure = True
-
-    return {
-        "httponly": True,
-        "secure": secure,
-        "samesite": samesite,
-        "max_age": 60 * 60 * 24 * 7,  # 7 days
-        "path": "/",
-    }
+# ---- Session cookie config (shared with auth/SSO routers)
+from ._cookies import SESSION_COOKIE, _cookie_kwargs  # noqa: E402
 
 # Include routers
 from . import paywall  # noqa: E402
@@ -361,31 +566,21 @@ def ws_alerts_probe():
 SENDGRID_KEY = os.getenv("SENDGRID_API_KEY", "").strip()
 ALERT_FROM = os.getenv("ALERT_EMAIL_FROM", "").strip()
 ALERT_TO = os.getenv("ALERT_EMAIL_TO", "").strip()
+# parallel sends per batch; keep it modest, SendGrid rate-limits bursts
+ALERT_EMAIL_CONCURRENCY = max(1, int(os.getenv("ALERT_EMAIL_CONCURRENCY", "10")))
 
 def _send_email(subject: str, text: str, to_email: Optional[str] = None) -> Dict[str, Any]:
     recipient = (to_email or ALERT_TO).strip()
     if not (SENDGRID_KEY and ALERT_FROM and recipient):
         return {"sent": False, "reason": "missing SENDGRID_API_KEY/ALERT_EMAIL_FROM/ALERT_EMAIL_TO"}
     try:
-        from sendgrid import SendGridAPIClient
-        from sendgrid.helpers.mail import Mail, Email, To, Content
-        msg = Mail(
-            from_email=Email(ALERT_FROM),
-            to_emails=To(recipient),
-            subject=subject,
-            plain_text_content=Content("text/plain", text),
-        )
-        sg = SendGridAPIClient(SENDGRID_KEY)
-        resp = sg.send(msg)
-        ok = 200 <= resp.status_code < 300
-        return {"sent": ok, "status_code": resp.status_code, "to": recipient}
+        # mailer's pooled client, so a batch of alerts shares TCP+TLS
+        status = mailer.send_email(recipient, subject, text, from_email=ALERT_FROM)
+        return {"sent": 200 <= status < 300, "status_code": status, "to": recipient}
     except Exception as e:
         return {"sent": False, "error": str(e)}
 
-def notify_if_alert(tagged: TaggedTransaction) -> Dict[str, Any]:
-    threshold = float(os.getenv("RISK_THRESHOLD", "0.75"))
-    if (tagged.score or 0) < threshold:
-        return {"sent": False, "reason": f"score {tagged.score} < threshold {threshold}"}
+def _alert_message(tagged: TaggedTransaction) -> Tuple[str, str]:
     subject = f"[Klerno Labs Alert] {tagged.category or 'unknown'} — risk {round(tagged.score or 0, 3)}"
     lines = [
         f"Time:       {tagged.timestamp}",
@@ -401,7 +596,29 @@ def notify_if_alert(tagged: TaggedTransaction) -> Dict[str, Any]:
         f"Flags:      {', '.join(tagged.flags or []) or '—'}",
         f"Notes:      {getattr(tagged, 'notes', '') or '—'}",
     ]
-    return _send_email(subject, "\n".join(lines))
+    return subject, "\n".join(lines)
+
+def _below_threshold(tagged: TaggedTransaction, threshold: float) -> Optional[Dict[str, Any]]:
+    if (tagged.score or 0) < threshold:
+        return {"sent": False, "reason": f"score {tagged.score} < threshold {threshold}"}
+    return None
+
+def notify_if_alert(tagged: TaggedTransaction) -> Dict[str, Any]:
+    return _below_threshold(tagged, RISK_THRESHOLD) or _send_email(*_alert_message(tagged))
+
+def notify_all(tagged: List[TaggedTransaction]) -> List[Dict[str, Any]]:
+    """
+    notify_if_alert for a batch, results in input order. The alert emails go out
+    concurrently (up to ALERT_EMAIL_CONCURRENCY) instead of one round-trip each.
+    """
+    results: List[Optional[Dict[str, Any]]] = [_below_threshold(t, RISK_THRESHOLD) for t in tagged]
+    pending = [i for i, r in enumerate(results) if r is None]
+    if pending:
+        messages = [_alert_message(tagged[i]) for i in pending]
+        with ThreadPoolExecutor(max_workers=min(ALERT_EMAIL_CONCURRENCY, len(pending))) as pool:
+            for i, res in zip(pending, pool.map(lambda m: _send_email(*m), messages)):
+                results[i] = res
+    return results  # type: ignore[return-value]
 
 
 # ---------------- Landing & health ----------------
@@ -460,6 +677,8 @@ def signup_submit(request: Request, email: str = Form(...), password: str = Form
     if e == ADMIN_EMAIL or store.users_count() == 0:
         role, sub_active = "admin", True
     user = store.create_user(e, hash_pw(password), role=role, subscription_active=sub_active)
+    if user is None:  # lost a race with a concurrent signup for the same email
+        return templates.TemplateResponse("signup.html", {"request": request, "error": "User already exists"}, status_code=400)
     token = issue_jwt(user["id"], user["email"], user["role"])
     dest = "/dashboard" if (sub_active or role == "admin" or DEMO_MODE) else "/paywall"
     resp = RedirectResponse(url=dest, status_code=303)
@@ -509,97 +728,51 @@ def me_settings_post(payload: SettingsPayload, user=Depends(require_user)):
 # ---------------- Core API ----------------
 @app.post("/analyze/tx", response_model=TaggedTransaction)
 def analyze_tx(tx: Transaction, _auth: bool = Security(enforce_api_key)):
-    risk, flags = score_risk(tx)
-    category = tag_category(tx)
-    return TaggedTransaction(**_dump(tx), score=risk, flags=flags, category=category)
+    risk, flags, category = _score_one(tx)
+    return TaggedTransaction(**_fields(tx), score=risk, flags=flags, category=category)
 
 @app.post("/analyze/batch")
 def analyze_batch(txs: List[Transaction], _auth: bool = Security(enforce_api_key)):
-    tagged: List[TaggedTransaction] = []
-    for tx in txs:
-        risk, flags = score_risk(tx)
-        category = tag_category(tx)
-        tagged.append(TaggedTransaction(**_dump(tx), score=risk, flags=flags, category=category))
-    return {"summary": summary(tagged).model_dump(), "items": [t.model_dump() for t in tagged]}
+    tagged = _tag_all(txs)
+    return {"summary": summary(tagged).model_dump(), "items": _dump_tagged(tagged)}
 
 @app.post("/report/csv")
 def report_csv(req: ReportRequest, _auth: bool = Security(enforce_api_key)):
-    df = pd.read_csv(os.path.join(BASE_DIR, "..", "data", "sample_transactions.csv"))
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    for col in ("from_addr", "to_addr"):
-        if col not in df.columns:
-            df[col] = ""
+    df = _read_sample_dated()
     wallets = set(getattr(req, "wallet_addresses", None) or ([] if not getattr(req, "address", None) else [req.address]))
     start = pd.to_datetime(req.start) if getattr(req, "start", None) else df["timestamp"].min()
     end = pd.to_datetime(req.end) if getattr(req, "end", None) else df["timestamp"].max()
     mask_wallet = True if not wallets else (df["to_addr"].isin(wallets) | df["from_addr"].isin(wallets))
     mask = (df["timestamp"] >= start) & (df["timestamp"] <= end) & mask_wallet
-    selected = df[mask].copy()
-    tx_field_names = {f.name for f in dc_fields(Transaction)}
-    items: List[TaggedTransaction] = []
-    for _, row in selected.iterrows():
-        raw = {k: (None if pd.isna(v) else v) for k, v in row.to_dict().items()}
-        raw.setdefault("memo", ""); raw.setdefault("notes", "")
-        clean = {k: v for k, v in raw.items() if k in tx_field_names}
-        tx = Transaction(**clean)
-        risk, flags = score_risk(tx)
-        category = tag_category(tx)
-        items.append(TaggedTransaction(**_dump(tx), score=risk, flags=flags, category=category))
-    return {"csv": csv_export(items)}
+    return {"csv": csv_export(_tag_frame(_tx_frame(df[mask])))}
 
 
 # ---------------- XRPL parse (posted JSON) ----------------
 @app.post("/integrations/xrpl/parse")
 def parse_xrpl(account: str, payload: List[Dict[str, Any]], _auth: bool = Security(enforce_api_key)):
-    txs = xrpl_json_to_transactions(account, payload)
-    tagged: List[TaggedTransaction] = []
-    for tx in txs:
-        risk, flags = score_risk(tx)
-        category = tag_category(tx)
-        tagged.append(TaggedTransaction(**_dump(tx), score=risk, flags=flags, category=category))
-    return {"summary": summary(tagged).model_dump(), "items": [t.model_dump() for t in tagged]}
+    tagged = _tag_xrpl(account, payload)
+    return {"summary": summary(tagged).model_dump(), "items": _dump_tagged(tagged)}
 
 @app.post("/analyze/sample")
 def analyze_sample(_auth: bool = Security(enforce_api_key)):
-    data_path = os.path.join(BASE_DIR, "..", "data", "sample_transactions.csv")
-    df = pd.read_csv(data_path)
-    text_cols = ("memo", "notes", "symbol", "direction", "chain", "tx_id", "from_addr", "to_addr")
-    for col in text_cols:
-        if col in df.columns:
-            df[col] = df[col].fillna("").astype(str)
-    if "timestamp" in df.columns:
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce").dt.strftime("%Y-%m-%dT%H:%M:%S")
-    for col in ("amount", "fee", "risk_score"):
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-    txs: List[Transaction] = []
-    tx_field_names = {f.name for f in dc_fields(Transaction)}
-    for _, row in df.iterrows():
-        raw = {k: (None if pd.isna(v) else v) for k, v in row.to_dict().items()}
-        raw.setdefault("memo", ""); raw.setdefault("notes", "")
-        clean = {k: v for k, v in raw.items() if k in tx_field_names}
-        txs.append(Transaction(**clean))
-    tagged: List[TaggedTransaction] = []
-    for tx in txs:
-        risk, flags = score_risk(tx)
-        category = tag_category(tx)
-        tagged.append(TaggedTransaction(**_dump(tx), score=risk, flags=flags, category=category))
-    return {"summary": summary(tagged).model_dump(), "items": [t.model_dump() for t in tagged]}
+    tagged = _tag_frame(_tx_frame(_read_sample_typed()))
+    return {"summary": summary(tagged).model_dump(), "items": _dump_tagged(tagged)}
 
 
 # ---------------- “Memory” (DB) + email on save ----------------
 @app.post("/analyze_and_save/tx")
 async def analyze_and_save_tx(tx: Transaction, _auth: bool = Security(enforce_api_key)):
-    risk, flags = score_risk(tx)
-    category = tag_category(tx)
-    tagged = TaggedTransaction(**_dump(tx), score=risk, flags=flags, category=category)
+    risk, flags, category = _score_one(tx)
+    tagged = TaggedTransaction(**_fields(tx), score=risk, flags=flags, category=category)
     d = tagged.model_dump()
     d["risk_score"] = d.get("score")
     d["risk_flags"] = d.get("flags")
     d["risk_bucket"] = _risk_bucket(d.get("risk_score", 0))
-    store.save_tagged(d)
+    await asyncio.to_thread(store.save_tagged, d)
+    # new rows: don't let /admin/api/stats lag behind by its TTL
+    await cache.delete_prefix(STATS_CACHE_PREFIX)
     await live.publish(d)
-    email_result = notify_if_alert(tagged)
+    email_result = await asyncio.to_thread(notify_if_alert, tagged)
     return {"saved": True, "item": d, "email": email_result}
 
 @app.get("/transactions/{wallet}")
@@ -609,49 +782,34 @@ def get_transactions_for_wallet(wallet: str, limit: int = 100, _auth: bool = Sec
 
 @app.get("/alerts")
 def get_alerts(limit: int = 100, _auth: bool = Security(enforce_api_key)):
-    threshold = float(os.getenv("RISK_THRESHOLD", "0.75"))
+    threshold = RISK_THRESHOLD
     rows = store.list_alerts(threshold, limit=limit)
     return {"threshold": threshold, "count": len(rows), "items": rows}
 
 
 # ---------------- XRPL fetch (read-only) ----------------
 @app.get("/integrations/xrpl/fetch")
-def xrpl_fetch(account: str, limit: int = 10, _auth: bool = Security(enforce_api_key)):
-    raw = fetch_account_tx(account, limit=limit)
-    txs = xrpl_json_to_transactions(account, raw)
-    tagged: List[TaggedTransaction] = []
-    for tx in txs:
-        risk, flags = score_risk(tx)
-        category = tag_category(tx)
-        tagged.append(TaggedTransaction(**_dump(tx), score=risk, flags=flags, category=category))
-    return {"count": len(tagged), "items": [t.model_dump() for t in tagged]}
+async def xrpl_fetch(account: str, limit: int = 10, _auth: bool = Security(enforce_api_key)):
+    raw = await fetch_account_tx_async(account, limit=limit)
+    tagged = await asyncio.to_thread(_tag_xrpl, account, raw)
+    return {"count": len(tagged), "items": _dump_tagged(tagged)}
 
 @app.post("/integrations/xrpl/fetch_and_save")
 async def xrpl_fetch_and_save(account: str, limit: int = 10, _auth: bool = Security(enforce_api_key)):
-    raw = fetch_account_tx(account, limit=limit)
-    txs = xrpl_json_to_transactions(account, raw)
-    saved = 0
-    tagged_items: List[Dict[str, Any]] = []
-    emails: List[Dict[str, Any]] = []
-    for tx in txs:
-        risk, flags = score_risk(tx)
-        category = tag_category(tx)
-        tagged = TaggedTransaction(**_dump(tx), score=risk, flags=flags, category=category)
-        d = tagged.model_dump()
-        d["risk_score"] = d.get("score")
-        d["risk_flags"] = d.get("flags")
-        d["risk_bucket"] = _risk_bucket(d.get("risk_score", 0))
-        store.save_tagged(d)
-        saved += 1
-        tagged_items.append(d)
-        emails.append(notify_if_alert(tagged))
+    raw = await fetch_account_tx_async(account, limit=limit)
+    # tagging and the SQLite write are blocking; keep them off the event loop
+    tagged_all = await asyncio.to_thread(_tag_xrpl, account, raw)
+    tagged_items = await asyncio.to_thread(_save_tagged_items, tagged_all)
+    await cache.delete_prefix(STATS_CACHE_PREFIX)
+    for d in tagged_items:
         await live.publish(d)
+    emails = await asyncio.to_thread(notify_all, tagged_all)
     return {
         "account": account,
         "requested": limit,
-        "fetched": len(txs),
-        "saved": saved,
-        "threshold": float(os.getenv("RISK_THRESHOLD", "0.75")),
+        "fetched": len(tagged_all),
+        "saved": len(tagged_items),
+        "threshold": RISK_THRESHOLD,
         "items": tagged_items,
         "emails": emails,
     }
@@ -667,6 +825,16 @@ def export_csv_from_db(wallet: str | None = None, limit: int = 1000, _auth: bool
     return {"rows": len(rows), "csv": df.to_csv(index=False)}
 
 
+def _csv_chunks(batches: Iterable[List[Dict[str, Any]]]) -> Iterator[str]:
+    """CSV for a download, one store batch at a time: rows are read and serialized as the body streams."""
+    header = True
+    for rows in batches:
+        yield pd.DataFrame(rows).to_csv(index=False, header=header)
+        header = False
+    if header:  # no rows: same body an empty frame gives
+        yield pd.DataFrame([]).to_csv(index=False)
+
+
 # ---- helper: allow ?key=... or x-api-key header for download ----
 def _check_key_param_or_header(key: Optional[str] = None, x_api_key: Optional[str] = Header(default=None)):
     exp = expected_api_key() or ""
@@ -677,12 +845,7 @@ def _check_key_param_or_header(key: Optional[str] = None, x_api_key: Optional[st
 @app.get("/export/csv/download")
 def export_csv_download(wallet: str | None = None, limit: int = 1000, key: Optional[str] = None, x_api_key: Optional[str] = Header(None)):
     _check_key_param_or_header(key=key, x_api_key=x_api_key)
-    rows = store.list_by_wallet(wallet, limit=limit) if wallet else store.list_all(limit=limit)
-    df = pd.DataFrame(rows)
-    buf = StringIO()
-    df.to_csv(buf, index=False)
-    buf.seek(0)
-    return StreamingResponse(iter([buf.read()]), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=klerno-export.csv"})
+    return StreamingResponse(_csv_chunks(store.iter_rows(wallet, limit=limit)), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=klerno-export.csv"})
 
 
 # ---------------- CSV export (UI, session-protected) ----------------
@@ -692,13 +855,8 @@ def ui_export_csv_download(
     limit: int = 1000,
     _user = Depends(require_paid_or_admin),
 ):
-    rows = store.list_by_wallet(wallet, limit=limit) if wallet else store.list_all(limit=limit)
-    df = pd.DataFrame(rows)
-    buf = StringIO()
-    df.to_csv(buf, index=False)
-    buf.seek(0)
     return StreamingResponse(
-        iter([buf.read()]),
+        _csv_chunks(store.iter_rows(wallet, limit=limit)),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=klerno-export.csv"},
     )
@@ -706,85 +864,47 @@ def ui_export_csv_download(
 
 # ---------------- Metrics (JSON) ----------------
 
-# tiny in-proc TTL cache to avoid heavy recompute
-_METRICS_CACHE: Dict[Tuple[Optional[float], Optional[int]], Tuple[float, Dict[str, Any]]] = {}
+# tiny in-proc TTL cache to avoid heavy recompute; keyed on the clamped inputs
+# (so ?threshold=0.75 and no threshold share an entry) and size-bounded
 _METRICS_TTL_SEC = 5.0
-
-def _metrics_cached(threshold: Optional[float], days: Optional[int]) -> Optional[Dict[str, Any]]:
-    key = (threshold, days)
-    item = _METRICS_CACHE.get(key)
-    now = datetime.utcnow().timestamp()
-    if item and (now - item[0]) <= _METRICS_TTL_SEC:
-        return item[1]
-    return None
-
-def _metrics_put(threshold: Optional[float], days: Optional[int], data: Dict[str, Any]):
-    key = (threshold, days)
-    _METRICS_CACHE[key] = (datetime.utcnow().timestamp(), data)
+_METRICS_CACHE = TTLCache(maxsize=256, ttl=_METRICS_TTL_SEC)
 
 @app.get("/metrics")
 def metrics(threshold: float | None = None, days: int | None = None, _auth: bool = Security(enforce_api_key)):
-    cached = _metrics_cached(threshold, days)
+    thr = RISK_THRESHOLD if threshold is None else float(threshold)
+    thr = max(0.0, min(1.0, thr))
+    window = None if days is None else max(1, min(int(days), 365))
+
+    key = (thr, window)
+    cached = _METRICS_CACHE.get(key)
     if cached is not None:
         return cached
 
-    rows = store.list_all(limit=10000)
-    if not rows:
-        data = {"total": 0, "alerts": 0, "avg_risk": 0, "categories": {}, "series_by_day": [], "series_by_day_lmh": []}
-        _metrics_put(threshold, days, data)
-        return data
-
-    env_threshold = float(os.getenv("RISK_THRESHOLD", "0.75"))
-    thr = env_threshold if threshold is None else float(threshold)
-    thr = max(0.0, min(1.0, thr))
-
-    cutoff = None
-    if days is not None:
-        try:
-            d = max(1, min(int(days), 365))
-            cutoff = datetime.utcnow() - timedelta(days=d)
-        except Exception:
-            cutoff = None
+    since = None
+    if window is not None:
+        since = (datetime.utcnow() - timedelta(days=window)).strftime("%Y-%m-%dT%H:%M:%S")
 
-    df = pd.DataFrame(rows)
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    df["risk_score"] = df.apply(lambda rr: _row_score(rr), axis=1)
-    if cutoff is not None:
-        df = df[df["timestamp"] >= cutoff]
-    if df.empty:
+    # aggregated in the database: one GROUP BY instead of 10k rows through pandas
+    agg = store.metrics(thr, since=since, limit=10000)
+    if not agg["total"]:
         data = {"total": 0, "alerts": 0, "avg_risk": 0, "categories": {}, "series_by_day": [], "series_by_day_lmh": []}
-        _metrics_put(threshold, days, data)
+        _METRICS_CACHE.set(key, data)
         return data
 
-    total = int(len(df))
-    alerts = int((df["risk_score"] >= thr).sum())
-    avg_risk = float(df["risk_score"].mean())
-
-    # categories
-    categories: Dict[str, int] = {}
-    cats_series = (df["category"].fillna("unknown") if "category" in df.columns else pd.Series(["unknown"] * total))
-    for cat, cnt in cats_series.value_counts().items():
-        categories[str(cat)] = int(cnt)
-
-    df["day"] = df["timestamp"].dt.date
-    grp = df.groupby("day").agg(avg_risk=("risk_score", "mean")).reset_index()
-    series = [{"date": str(d), "avg_risk": round(float(v), 3)} for d, v in zip(grp["day"], grp["avg_risk"])]
-
+    days_agg = agg["series_by_day"]
+    series = [{"date": x["date"], "avg_risk": round(x["avg_risk"], 3)} for x in days_agg]
     # Low/Med/High daily counts for stacked chart
-    df["bucket"] = df["risk_score"].apply(_risk_bucket)
-    crosstab = df.pivot_table(index="day", columns="bucket", values="risk_score", aggfunc="count").fillna(0)
-    crosstab = crosstab.reindex(sorted(crosstab.index))
-    series_lmh = []
-    for d, row in crosstab.iterrows():
-        series_lmh.append({
-            "date": str(d),
-            "low": int(row.get("low", 0)),
-            "medium": int(row.get("medium", 0)),
-            "high": int(row.get("high", 0)),
-        })
-
-    data = {"total": total, "alerts": alerts, "avg_risk": round(avg_risk, 3), "categories": categories, "series_by_day": series, "series_by_day_lmh": series_lmh}
-    _metrics_put(threshold, days, data)
+    series_lmh = [{"date": x["date"], "low": x["low"], "medium": x["medium"], "high": x["high"]} for x in days_agg]
+
+    data = {
+        "total": agg["total"],
+        "alerts": agg["alerts"],
+        "avg_risk": round(agg["avg_risk"], 3),
+        "categories": agg["categories"],
+        "series_by_day": series,
+        "series_by_day_lmh": series_lmh,
+    }
+    _METRICS_CACHE.set(key, data)
     return data
 
 
@@ -802,80 +922,38 @@ def metrics_ui(
 
 @app.get("/alerts-ui/data", include_in_schema=False)
 def alerts_ui_data(limit: int = 100, _user=Depends(require_paid_or_admin)):
-    threshold = float(os.getenv("RISK_THRESHOLD", "0.75"))
+    threshold = RISK_THRESHOLD
     rows = store.list_alerts(threshold, limit=limit)
     return {"threshold": threshold, "count": len(rows), "items": rows}
 
 # Save demo/sample data to DB so dashboard shows data, and live-push
 @app.post("/uiapi/analyze/sample", include_in_schema=False)
 async def ui_analyze_sample(_user=Depends(require_paid_or_admin), _=Depends(csrf_protect_ui)):
-    data_path = os.path.join(BASE_DIR, "..", "data", "sample_transactions.csv")
-    df = pd.read_csv(data_path)
-
-    text_cols = ("memo", "notes", "symbol", "direction", "chain", "tx_id", "from_addr", "to_addr")
-    for col in text_cols:
-        if col in df.columns:
-            df[col] = df[col].fillna("").astype(str)
-
-    if "timestamp" in df.columns:
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce").dt.strftime("%Y-%m-%dT%H:%M:%S")
-
-    for col in ("amount", "fee", "risk_score"):
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    tx_field_names = {f.name for f in dc_fields(Transaction)}
-    tagged: List[TaggedTransaction] = []
-    saved = 0
-
-    for _, row in df.iterrows():
-        raw = {k: (None if pd.isna(v) else v) for k, v in row.to_dict().items()}
-        raw.setdefault("memo", ""); raw.setdefault("notes", "")
-        clean = {k: v for k, v in raw.items() if k in tx_field_names}
-        tx = Transaction(**clean)
-
-        risk, flags = score_risk(tx)
-        category = tag_category(tx)
-        t = TaggedTransaction(**_dump(tx), score=risk, flags=flags, category=category)
-        tagged.append(t)
-
-        d = t.model_dump()
-        d["risk_score"] = d.get("score")
-        d["risk_flags"] = d.get("flags")
-        d["risk_bucket"] = _risk_bucket(d.get("risk_score", 0))
-        store.save_tagged(d)
-        saved += 1
+    tagged = await asyncio.to_thread(lambda: _tag_frame(_tx_frame(_read_sample_typed())))
+    saved_items = await asyncio.to_thread(_save_tagged_items, tagged)
+    await cache.delete_prefix(STATS_CACHE_PREFIX)
+    for d in saved_items:
         await live.publish(d)
 
-    return {"summary": summary(tagged).model_dump(), "saved": saved, "items": [t.model_dump() for t in tagged]}
+    return {"summary": summary(tagged).model_dump(), "saved": len(saved_items), "items": _dump_tagged(tagged)}
 
 # Session-protected XRPL fetch used by the dashboard button
 @app.post("/uiapi/integrations/xrpl/fetch_and_save", include_in_schema=False)
 async def ui_xrpl_fetch_and_save(account: str, limit: int = 10, _user=Depends(require_paid_or_admin), _=Depends(csrf_protect_ui)):
-    raw = fetch_account_tx(account, limit=limit)
-    txs = xrpl_json_to_transactions(account, raw)
-    saved = 0
-    tagged_items: List[Dict[str, Any]] = []
-    emails: List[Dict[str, Any]] = []
-    for tx in txs:
-        risk, flags = score_risk(tx)
-        category = tag_category(tx)
-        tagged = TaggedTransaction(**_dump(tx), score=risk, flags=flags, category=category)
-        d = tagged.model_dump()
-        d["risk_score"] = d.get("score")
-        d["risk_flags"] = d.get("flags")
-        d["risk_bucket"] = _risk_bucket(d.get("risk_score", 0))
-        store.save_tagged(d)
-        saved += 1
-        tagged_items.append(d)
-        emails.append(notify_if_alert(tagged))
+    raw = await fetch_account_tx_async(account, limit=limit)
+    # tagging and the SQLite write are blocking; keep them off the event loop
+    tagged_all = await asyncio.to_thread(_tag_xrpl, account, raw)
+    tagged_items = await asyncio.to_thread(_save_tagged_items, tagged_all)
+    await cache.delete_prefix(STATS_CACHE_PREFIX)
+    for d in tagged_items:
         await live.publish(d)
+    emails = await asyncio.to_thread(notify_all, tagged_all)
     return {
         "account": account,
         "requested": limit,
-        "fetched": len(txs),
-        "saved": saved,
-        "threshold": float(os.getenv("RISK_THRESHOLD", "0.75")),
+        "fetched": len(tagged_all),
+        "saved": len(tagged_items),
+        "threshold": RISK_THRESHOLD,
         "items": tagged_items,
         "emails": emails,
     }
@@ -884,7 +962,7 @@ async def ui_xrpl_fetch_and_save(account: str, limit: int = 10, _user=Depends(re
 @app.get("/uiapi/recent", include_in_schema=False)
 def ui_recent(limit: int = 50, only_alerts: bool = False, _user=Depends(require_paid_or_admin)):
     if only_alerts:
-        thr = float(os.getenv("RISK_THRESHOLD", "0.75"))
+        thr = RISK_THRESHOLD
         rows = store.list_alerts(threshold=thr, limit=limit)
     else:
         rows = store.list_all(limit=limit)
@@ -1004,34 +1082,33 @@ def ui_profile_year_export(year: int, format: str = "qb", _user=Depends(require_
 
 
 # ---------------- UI: Dashboard & Alerts ----------------
+# Rendered UI pages for a few seconds (same freshness as /metrics). Neither page
+# varies by user; root_path is in the key because url_path_for depends on it.
+_PAGE_CACHE = TTLCache(maxsize=16, ttl=_METRICS_TTL_SEC)
+
+def _cached_page(request: Request, name: str, context: Callable[[], Dict[str, Any]]) -> HTMLResponse:
+    key = (name, request.scope.get("root_path", ""))
+    body = _PAGE_CACHE.get(key)
+    if body is None:
+        body = templates.TemplateResponse(name, {"request": request, **context()}).body
+        _PAGE_CACHE.set(key, body)
+    return HTMLResponse(body)
+
 @app.get("/dashboard", name="ui_dashboard", include_in_schema=False)
 def ui_dashboard(request: Request, _user=Depends(require_paid_or_admin)):
-    rows = store.list_all(limit=200)
-    total = len(rows)
-    threshold = float(os.getenv("RISK_THRESHOLD", "0.75"))
-    alerts = [r for r in rows if _row_score(r) >= threshold]
-    avg_risk = round(sum(_row_score(r) for r in rows) / total, 3) if total else 0.0
-    cats: Dict[str, int] = {}
-    for r in rows:
-        c = r.get("category") or "unknown"
-        cats[c] = cats.get(c, 0) + 1
-    metrics_data = {"total": total, "alerts": len(alerts), "avg_risk": avg_risk, "categories": cats}
-    resp = templates.TemplateResponse("dashboard.html", {
-        "request": request,
-        "title": "Dashboard",
-        "key": None,
-        "metrics": metrics_data,
-        "rows": rows,
-        "threshold": threshold
-    })
+    # the page only templates title/key; its numbers and rows come from /metrics-ui client-side
+    resp = _cached_page(request, "dashboard.html", lambda: {"title": "Dashboard", "key": None})
     issue_csrf_cookie(resp)
     return resp
 
 @app.get("/alerts-ui", name="ui_alerts", include_in_schema=False)
 def ui_alerts(request: Request, _user=Depends(require_paid_or_admin)):
-    threshold = float(os.getenv("RISK_THRESHOLD", "0.75"))
-    rows = store.list_alerts(threshold=threshold, limit=500)
-    return templates.TemplateResponse("alerts.html", {"request": request, "title": f"Alerts (≥ {threshold})", "key": None, "rows": rows})
+    threshold = RISK_THRESHOLD
+    return _cached_page(request, "alerts.html", lambda: {
+        "title": f"Alerts (≥ {threshold})",
+        "key": None,
+        "rows": store.list_alerts(threshold=threshold, limit=500),
+    })
 
 
 # ---------------- Admin / Email tests ----------------
@@ -1053,7 +1130,7 @@ def admin_test_email(request: Request):
         memo="Test email",
         fee=0.0001,
     )
-    tagged = TaggedTransaction(**_dump(tx), score=0.99, flags=["test_high_risk"], category="test-alert")
+    tagged = TaggedTransaction(**_fields(tx), score=0.99, flags=["test_high_risk"], category="test-alert")
     return {"ok": True, "email": notify_if_alert(tagged)}
 
 class NotifyRequest(BaseModel):
@@ -1084,50 +1161,51 @@ class BatchTx(BaseModel):
     items: List[Transaction]
 
 @app.post("/explain/tx")
-def explain_tx_endpoint(tx: Transaction, _auth: bool = Security(enforce_api_key)):
+async def explain_tx_endpoint(tx: Transaction, _auth: bool = Security(enforce_api_key)):
     try:
-        text = explain_tx(_dump(tx))
+        text = await explain_tx_async(_fields(tx))
         return {"explanation": text}
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return FastJSON(status_code=500, content={"error": str(e)})
 
 @app.post("/explain/batch")
-def explain_batch_endpoint(payload: BatchTx, _auth: bool = Security(enforce_api_key)):
+async def explain_batch_endpoint(
+    payload: BatchTx,
+    fused: bool = Query(False, description="One LLM call per 20 txs (short explanations) instead of one per tx"),
+    _auth: bool = Security(enforce_api_key),
+):
     try:
-        txs = [_dump(t) for t in payload.items]
-        result = explain_batch(txs)
+        txs = [_fields(t) for t in payload.items]
+        result = await (explain_batch_fused(txs) if fused else explain_batch_async(txs))
         return result
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return FastJSON(status_code=500, content={"error": str(e)})
 
 @app.post("/ask")
 def ask_endpoint(req: AskRequest, _auth: bool = Security(enforce_api_key)):
     try:
-        rows = store.list_all(limit=10000)
         spec = ask_to_filters(req.question)
-        filtered = _apply_filters_safe(rows, spec)
+        # predicates pushed into SQL; the exact filter below runs on what's left
+        rows = store.query(spec, limit=10000)
+        # column view: filtering and the selection stats share one parse of the rows
+        filtered = _llm_filter_rows(rows, spec) if _llm_filter_rows else _apply_filters_safe(rows, spec)
         answer = explain_selection(req.question, filtered)
         preview = filtered[:50]
         return {"filters": spec, "count": len(filtered), "preview": preview, "answer": answer}
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return FastJSON(status_code=500, content={"error": str(e)})
 
 @app.get("/explain/summary")
 def explain_summary(days: int = 7, wallet: str | None = None, _auth: bool = Security(enforce_api_key)):
     try:
-        rows = store.list_by_wallet(wallet, limit=5000) if wallet else store.list_all(limit=5000)
         cutoff = datetime.utcnow() - timedelta(days=max(1, min(days, 90)))
-        recent = []
-        for r in rows:
-            try:
-                t = datetime.fromisoformat(str(r.get("timestamp")))
-                if t >= cutoff:
-                    recent.append(r)
-            except Exception:
-                continue
+        # one vectorized parse of the timestamp column; unparseable rows drop out
+        spec = {"date_from": cutoff.isoformat()}
+        rows = store.query(spec, limit=5000, wallet=wallet)
+        recent = _llm_filter_rows(rows, spec) if _llm_filter_rows else _apply_filters_safe(rows, spec)
         return summarize_rows(recent, title=f"Last {days} days summary")
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return FastJSON(status_code=500, content={"error": str(e)})
 
 # NLQ → filters + AI search wrappers (session-protected for UI)
 class NLQRequest(BaseModel):
@@ -1139,17 +1217,17 @@ def ai_nlq_to_filters(req: NLQRequest, _user=Depends(require_paid_or_admin)):
         spec = ask_to_filters(req.query)
         return {"filters": spec}
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return FastJSON(status_code=500, content={"error": str(e)})
 
 @app.post("/ai/search", include_in_schema=False)
 def ai_search(req: NLQRequest, _user=Depends(require_paid_or_admin)):
     try:
         spec = ask_to_filters(req.query)
-        rows = store.list_all(limit=10000)
+        rows = store.query(spec, limit=10000)
         filtered = _apply_filters_safe(rows, spec)
         return {"filters": spec, "count": len(filtered), "items": filtered[:1000]}
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return FastJSON(status_code=500, content={"error": str(e)})
 
 # simple anomaly scoring (z-score on amounts)
 @app.get("/ai/anomaly/scores", include_in_schema=False)
@@ -1,11 +1,16 @@
 # app/notifications.py
 import os, httpx
+from functools import lru_cache
 
 SLACK_WEBHOOK = (os.getenv("SLACK_WEBHOOK_URL") or "").strip()
 
+@lru_cache(maxsize=1)
+def _aclient() -> httpx.AsyncClient:
+    """Shared keep-alive client (first use binds it to the running loop)."""
+    return httpx.AsyncClient(timeout=10)
+
 async def slack_notify(text: str) -> dict:
     if not SLACK_WEBHOOK:
         return {"sent": False, "reason": "no webhook configured"}
-    async with httpx.AsyncClient(timeout=10) as c:
-        r = await c.post(SLACK_WEBHOOK, json={"text": text})
-        return {"sent": (200 <= r.status_code < 300), "status": r.status_code}
+    r = await _aclient().post(SLACK_WEBHOOK, json={"text": text})
+    return {"sent": (200 <= r.status_code < 300), "status": r.status_code}
@@ -9,12 +9,11 @@ from pathlib import Path
 from typing import Optional
 
 from fastapi import Header, HTTPException, Request, status
-from dotenv import load_dotenv, find_dotenv
 
-# --- Load .env robustly (works from OneDrive, nested folders, etc.) ---
+from .cache import TTLCache
+
+# .env is loaded once in app/__init__.py
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
-DOTENV_PATH = find_dotenv(usecwd=True) or str(PROJECT_ROOT / ".env")
-load_dotenv(dotenv_path=DOTENV_PATH, override=False)
 
 # --- File-based key storage (used when ENV key is not set) ---
 _DATA_DIR = (PROJECT_ROOT / "data")
@@ -22,16 +21,13 @@ _DATA_DIR.mkdir(parents=True, exist_ok=True)
 _KEY_FILE = _DATA_DIR / "api_key.secret"
 _META_FILE = _DATA_DIR / "api_key.meta"
 
+# enforce_api_key runs on every protected request; resolve the key (env lookups,
+# then the file) once per TTL instead of each call. Rotation clears it here;
+# other workers pick the new key up within the TTL.
+_KEY_CACHE = TTLCache(maxsize=1, ttl=5)
 
-def expected_api_key() -> str:
-    """
-    Priority:
-      1) ENV: X_API_KEY (or API_KEY)
-      2) File: data/api_key.secret (written by admin rotation)
-    """
-    env = (os.getenv("X_API_KEY") or os.getenv("API_KEY") or "").strip()
-    if env:
-        return env
+
+def _read_key_file() -> str:
     if _KEY_FILE.exists():
         try:
             return _KEY_FILE.read_text(encoding="utf-8").strip()
@@ -40,6 +36,19 @@ def expected_api_key() -> str:
     return ""
 
 
+def expected_api_key() -> str:
+    """
+    Priority:
+      1) ENV: X_API_KEY (or API_KEY)
+      2) File: data/api_key.secret (written by admin rotation)
+    """
+    key = _KEY_CACHE.get("key")
+    if key is None:
+        key = (os.getenv("X_API_KEY") or os.getenv("API_KEY") or "").strip() or _read_key_file()
+        _KEY_CACHE.set("key", key)
+    return key
+
+
 def _write_api_key(new_key: str) -> None:
     _KEY_FILE.write_text(new_key, encoding="utf-8")
     try:
@@ -47,6 +56,7 @@ def _write_api_key(new_key: str) -> None:
     except Exception:
         pass
     _META_FILE.write_text(str(int(time.time())), encoding="utf-8")
+    _KEY_CACHE.clear()
 
 
 def generate_api_key(nbytes: int = 32) -> str:
@@ -1,15 +1,35 @@
 # app/security_session.py
+import hashlib
 import os
+import time
 from datetime import datetime, timedelta, timezone
 import jwt
 from passlib.context import CryptContext
 
+from .cache import TTLCache
+
 # ENV
 SECRET_KEY = os.getenv("JWT_SECRET", "CHANGE_ME_32+_chars")
 ALGO = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 
-_pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Decoder state is fixed per process: build it once, not per request.
+_JWT = jwt.PyJWT()
+_KEY = SECRET_KEY.encode("utf-8")
+_ALGORITHMS = [ALGO]
+# sha256(token) -> verified payload; entries never outlive the token's "exp".
+# Keyed by digest so raw bearer tokens are never held in memory past the request.
+_VERIFIED = TTLCache(maxsize=10_000, ttl=5)
+
+# argon2id for new hashes (tuned to the OWASP minimum: 19 MiB, t=2, p=1);
+# existing bcrypt hashes still verify.
+_pwd = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__time_cost=2,
+    argon2__memory_cost=19456,
+    argon2__parallelism=1,
+)
 
 def hash_pw(password: str) -> str:
     return _pwd.hash(password)
@@ -34,4 +54,13 @@ def issue_jwt(uid: int, email: str, role: str, minutes: int | None = None) -> st
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGO)
 
 def decode_jwt(token: str) -> dict:
-    return jwt.decode(token, SECRET_KEY, algorithms=[ALGO])
\ No newline at end of file
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = _VERIFIED.get(key)
+    if payload is None:
+        payload = _JWT.decode(token, _KEY, algorithms=_ALGORITHMS)  # raises on bad/expired
+        ttl = _VERIFIED.ttl
+        if "exp" in payload:
+            ttl = min(ttl, payload["exp"] - time.time())
+        if ttl > 0:
+            _VERIFIED.set(key, payload, ttl=ttl)
+    return dict(payload)
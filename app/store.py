@@ -1,6 +1,10 @@
 # app/store.py
-import os, json, sqlite3
-from typing import List, Dict, Any, Iterable, Optional
+import os, json, math, sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from .cache import TTLCache
 
 # --- Config & detection -------------------------------------------------------
 
@@ -20,6 +24,9 @@ except Exception:
 
 USING_POSTGRES = bool(DATABASE_URL) and PSYCOPG2_AVAILABLE
 
+# INSERT ... RETURNING needs SQLite >= 3.35
+_SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
 
 # --- Connection factories -----------------------------------------------------
 
@@ -29,6 +36,8 @@ def _sqlite_conn() -> sqlite3.Connection:
     os.makedirs(data_dir, exist_ok=True)
     con = sqlite3.connect(DB_PATH, check_same_thread=False)
     con.row_factory = sqlite3.Row  # return dict-like rows to unify handling
+    # WAL (set once in init_db) makes NORMAL durable enough and much cheaper per commit
+    con.execute("PRAGMA synchronous=NORMAL")
     return con
 
 
@@ -46,6 +55,23 @@ def _conn():
     return _postgres_conn() if USING_POSTGRES else _sqlite_conn()
 
 
+@contextmanager
+def connection():
+    """
+    `with connection() as con:` -> commits on success, rolls back on error,
+    and always closes the connection.
+    """
+    con = _conn()
+    try:
+        yield con
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    finally:
+        con.close()
+
+
 def _ph() -> str:
     """Return the correct SQL placeholder for the active backend."""
     return "%s" if USING_POSTGRES else "?"
@@ -62,6 +88,9 @@ def init_db() -> None:
     Also adds helpful indexes.
     """
     con = _conn(); cur = con.cursor()
+    if not USING_POSTGRES:
+        # persistent per DB file: readers no longer block the admin write endpoints
+        cur.execute("PRAGMA journal_mode=WAL;")
 
     # ---- TXS TABLE ----
     if USING_POSTGRES:
@@ -86,6 +115,8 @@ def init_db() -> None:
         cur.execute("CREATE INDEX IF NOT EXISTS idx_txs_from_addr ON txs (from_addr);")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_txs_to_addr   ON txs (to_addr);")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_txs_timestamp ON txs (timestamp);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_txs_risk_score ON txs (risk_score);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_txs_category ON txs (category);")
     else:
         cur.execute("""
         CREATE TABLE IF NOT EXISTS txs (
@@ -108,6 +139,8 @@ def init_db() -> None:
         cur.execute("CREATE INDEX IF NOT EXISTS idx_txs_from_addr ON txs (from_addr);")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_txs_to_addr   ON txs (to_addr);")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_txs_timestamp ON txs (timestamp);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_txs_risk_score ON txs (risk_score);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_txs_category ON txs (category);")
 
     # ---- USERS TABLE ----
     if USING_POSTGRES:
@@ -201,23 +234,44 @@ def _row_to_user(row) -> Optional[Dict[str, Any]]:
 
 # --- Transactions API ---------------------------------------------------------
 
-def save_tagged(t: Dict[str, Any]) -> None:
-    con = _conn(); cur = con.cursor()
+def _insert_tx_sql() -> str:
     p = _ph()
-    cur.execute(f"""
+    return f"""
       INSERT INTO txs (
         tx_id, timestamp, chain, from_addr, to_addr, amount, symbol, direction,
         memo, fee, category, risk_score, risk_flags, notes
       )
       VALUES ({p},{p},{p},{p},{p},{p},{p},{p},{p},{p},{p},{p},{p},{p})
-    """, (
-        t["tx_id"], str(t["timestamp"]), t["chain"], t["from_addr"], t["to_addr"],
+    """
+
+
+def _tagged_params(t: Dict[str, Any]) -> tuple:
+    ts = t["timestamp"]
+    return (
+        t["tx_id"], None if ts is None else str(ts), t["chain"], t["from_addr"], t["to_addr"],
         float(t["amount"]), t["symbol"], t["direction"], t.get("memo"),
         float(t.get("fee") or 0.0), t.get("category", "unknown"),
         float(t.get("risk_score") or 0.0), json.dumps(t.get("risk_flags", [])),
         t.get("notes"),
-    ))
-    con.commit(); con.close()
+    )
+
+
+def save_tagged(t: Dict[str, Any]) -> None:
+    save_tagged_many([t])
+
+
+def save_tagged_many(rows: Iterable[Dict[str, Any]]) -> int:
+    """
+    Bulk insert tagged txs with a single executemany inside one transaction
+    (one commit instead of one per row; all-or-nothing, rolled back on error).
+    Returns the number of rows written.
+    """
+    params = [_tagged_params(t) for t in rows]
+    if not params:
+        return 0
+    with connection() as con:
+        con.cursor().executemany(_insert_tx_sql(), params)
+    return len(params)
 
 
 def list_by_wallet(wallet: str, limit: int = 100) -> List[Dict[str, Any]]:
@@ -267,6 +321,209 @@ def list_all(limit: int = 1000) -> List[Dict[str, Any]]:
     return _rows_to_dicts(rows)
 
 
+def iter_rows(wallet: Optional[str] = None, limit: int = 1000, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+    """
+    list_by_wallet (or list_all when no wallet) as batches of `batch_size` rows, read
+    off one cursor so a download never holds the whole result set. Closes on exhaustion
+    or when the consumer stops early.
+    """
+    con = _conn(); cur = con.cursor()
+    p = _ph()
+    where = f"WHERE from_addr = {p} OR to_addr = {p}" if wallet else ""
+    params = ((wallet, wallet) if wallet else ()) + (limit,)
+    try:
+        cur.execute(f"""
+          SELECT
+            tx_id, timestamp, chain, from_addr, to_addr, amount, symbol, direction,
+            memo, fee, category, risk_score, risk_flags, notes
+          FROM txs
+          {where}
+          ORDER BY id DESC
+          LIMIT {p}
+        """, params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield _rows_to_dicts(rows)
+    finally:
+        con.close()
+
+
+def stats(threshold: float = 0.75) -> Dict[str, Any]:
+    """Aggregate totals/avg risk/alert count and a category histogram in SQL."""
+    con = _conn(); cur = con.cursor()
+    p = _ph()
+    cur.execute(f"""
+      SELECT
+        COUNT(*) AS total,
+        COALESCE(AVG(COALESCE(risk_score, 0)), 0) AS avg_risk,
+        COALESCE(SUM(CASE WHEN risk_score >= {p} THEN 1 ELSE 0 END), 0) AS alerts
+      FROM txs
+    """, (threshold,))
+    row = cur.fetchone()
+    cur.execute("""
+      SELECT COALESCE(NULLIF(category, ''), 'unknown') AS c, COUNT(*) AS n
+      FROM txs
+      GROUP BY COALESCE(NULLIF(category, ''), 'unknown')
+    """)
+    cats = {r["c"]: int(r["n"]) for r in cur.fetchall()}
+    con.close()
+    return {
+        "total": int(row["total"] or 0),
+        "alerts": int(row["alerts"] or 0),
+        "avg_risk": float(row["avg_risk"] or 0.0),
+        "categories": cats,
+    }
+
+
+# Timestamps are stored as text, 'YYYY-MM-DD HH:MM:SS' or ISO 'T'-separated.
+# Portable (SQLite/Postgres) test for "starts with a YYYY-MM-DD date":
+_DATED = "(SUBSTR(timestamp, 5, 1) = '-' AND SUBSTR(timestamp, 8, 1) = '-')"
+
+
+def _day_bound(value: Any, days: int) -> Optional[str]:
+    """ISO date of `value` shifted by `days` (slack for UTC offsets); None if unparseable."""
+    try:
+        return (datetime.fromisoformat(str(value).replace("Z", "+00:00")) + timedelta(days=days)).date().isoformat()
+    except (ValueError, OverflowError):
+        return None
+
+
+def _spec_where(spec: Dict[str, Any]) -> Tuple[List[str], List[Any]]:
+    p = _ph()
+    clauses: List[str] = []
+    params: List[Any] = []
+
+    def _in(values: List[str]) -> str:
+        params.extend(values)
+        return ", ".join([p] * len(values))
+
+    # str(None) == "None" on the Python side, so NULL addresses compare as 'None'
+    addr = "COALESCE({col}, 'None') IN ({ph})"
+    exc = [str(w) for w in (spec.get("exclude_wallets") or ())]
+    if exc:
+        clauses.append(f"NOT ({addr.format(col='from_addr', ph=_in(exc))} OR {addr.format(col='to_addr', ph=_in(exc))})")
+    inc = [str(w) for w in (spec.get("include_wallets") or ())]
+    if inc:
+        clauses.append(f"({addr.format(col='from_addr', ph=_in(inc))} OR {addr.format(col='to_addr', ph=_in(inc))})")
+    cats = [str(c).casefold() for c in (spec.get("categories") or ())]
+    if cats and all(c.isascii() for c in cats):  # SQLite LOWER() only folds ASCII
+        clauses.append(f"LOWER(COALESCE(category, 'None')) IN ({_in(cats)})")
+    try:
+        if spec.get("min_risk") is not None:
+            params.append(float(spec["min_risk"])); clauses.append(f"risk_score >= {p}")
+        if spec.get("max_risk") is not None:
+            params.append(float(spec["max_risk"])); clauses.append(f"risk_score <= {p}")
+    except (TypeError, ValueError):
+        pass
+    lo = _day_bound(spec["date_from"], -1) if spec.get("date_from") else None
+    hi = _day_bound(spec["date_to"], 1) if spec.get("date_to") else None
+    if lo:
+        params.append(lo); clauses.append(f"(NOT {_DATED} OR SUBSTR(timestamp, 1, 10) >= {p})")
+    if hi:
+        params.append(hi); clauses.append(f"(NOT {_DATED} OR SUBSTR(timestamp, 1, 10) <= {p})")
+    return clauses, params
+
+
+def query(spec: Dict[str, Any], limit: int = 1000, wallet: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Rows for an /ask-style filter spec (see llm.apply_filters), taken from the newest
+    `limit` rows (of `wallet`, if given, like list_by_wallet). Wallet, category, risk
+    and a day-granular date bound run in SQL. They never drop a row apply_filters
+    would keep, so callers still apply the spec for exact semantics, on far fewer rows.
+    """
+    con = _conn(); cur = con.cursor()
+    p = _ph()
+    window_where, params = "", [limit]
+    if wallet:
+        window_where, params = f"WHERE from_addr = {p} OR to_addr = {p}", [wallet, wallet, limit]
+    clauses, spec_params = _spec_where(spec or {})
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    cur.execute(f"""
+      SELECT
+        tx_id, timestamp, chain, from_addr, to_addr, amount, symbol, direction,
+        memo, fee, category, risk_score, risk_flags, notes
+      FROM (
+        SELECT * FROM txs {window_where} ORDER BY id DESC LIMIT {p}
+      ) recent
+      {where}
+      ORDER BY id DESC
+    """, params + spec_params)
+    rows = cur.fetchall(); con.close()
+    return _rows_to_dicts(rows)
+
+
+def metrics(threshold: float = 0.75, since: Optional[str] = None, limit: int = 10000,
+            buckets: tuple = (0.33, 0.66)) -> Dict[str, Any]:
+    """
+    Dashboard aggregates over the newest `limit` rows in one GROUP BY (day, category):
+    totals, alert count, avg risk, category histogram (most common first) and a
+    per-day series with avg risk and low/medium/high counts. `since` is an ISO
+    'YYYY-MM-DDTHH:MM:SS' cutoff; rows without a parseable date are then excluded.
+    """
+    con = _conn(); cur = con.cursor()
+    p = _ph()
+    dated = _DATED
+    ts = "REPLACE(SUBSTR(timestamp, 1, 19), ' ', 'T')"
+    where = f"WHERE {dated} AND {ts} >= {p}" if since else ""
+    low, high = buckets
+    params: List[Any] = [threshold, low, low, high, high, limit] + ([since] if since else [])
+    cur.execute(f"""
+      SELECT
+        CASE WHEN {dated} THEN SUBSTR(timestamp, 1, 10) END AS day,
+        COALESCE(category, 'unknown') AS c,
+        COUNT(*) AS n,
+        MAX(id) AS last_id,
+        SUM(r) AS risk_sum,
+        SUM(CASE WHEN r >= {p} THEN 1 ELSE 0 END) AS alerts,
+        SUM(CASE WHEN r < {p} THEN 1 ELSE 0 END) AS low,
+        SUM(CASE WHEN r >= {p} AND r < {p} THEN 1 ELSE 0 END) AS medium,
+        SUM(CASE WHEN r >= {p} THEN 1 ELSE 0 END) AS high
+      FROM (
+        SELECT id, timestamp, category, COALESCE(risk_score, 0) AS r
+        FROM txs ORDER BY id DESC LIMIT {p}
+      ) recent
+      {where}
+      GROUP BY 1, 2
+    """, params)
+    rows = cur.fetchall(); con.close()
+
+    total = alerts = 0
+    risk_sums: List[float] = []
+    cats: Dict[str, List[int]] = {}
+    days: Dict[str, List[Any]] = {}
+    for r in rows:
+        n = int(r["n"])
+        part = float(r["risk_sum"] or 0.0)
+        total += n
+        alerts += int(r["alerts"] or 0)
+        risk_sums.append(part)
+        c = cats.setdefault(r["c"], [0, 0])
+        c[0] += n
+        c[1] = max(c[1], int(r["last_id"]))
+        if r["day"] is not None:
+            d = days.setdefault(r["day"], [0, [], 0, 0, 0])
+            d[0] += n
+            d[1].append(part)
+            d[2] += int(r["low"] or 0)
+            d[3] += int(r["medium"] or 0)
+            d[4] += int(r["high"] or 0)
+    # most common first; ties go to the most recently seen category
+    ordered = sorted(cats.items(), key=lambda kv: (-kv[1][0], -kv[1][1]))
+    # fsum: partial sums recombine without order-dependent rounding
+    return {
+        "total": total,
+        "alerts": alerts,
+        "avg_risk": math.fsum(risk_sums) / total if total else 0.0,
+        "categories": {k: v[0] for k, v in ordered},
+        "series_by_day": [
+            {"date": day, "avg_risk": math.fsum(d[1]) / d[0], "low": d[2], "medium": d[3], "high": d[4]}
+            for day, d in sorted(days.items())
+        ],
+    }
+
+
 # --- Users API ----------------------------------------------------------------
 
 def users_count() -> int:
@@ -278,7 +535,40 @@ def users_count() -> int:
     return int(row[0]) if row else 0
 
 
+# Per-process user cache keyed by ("email", e) and ("id", n); both keys are
+# written together and dropped together by _forget_user() on every write.
+# _forget_user() only reaches this process, so other workers can serve a stale
+# role/subscription until the TTL runs out: keep it to a few seconds.
+_USER_CACHE = TTLCache(maxsize=10_000, ttl=5)
+
+
+def _remember_user(user: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if user:
+        _USER_CACHE.set(("email", user["email"]), user)
+        _USER_CACHE.set(("id", user["id"]), user)
+        return dict(user)
+    return user
+
+
+def _forget_user(email: str) -> None:
+    _USER_CACHE.discard_where(lambda k, v: k == ("email", email) or v.get("email") == email)
+
+
 def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
+    cached = _USER_CACHE.get(("email", email))
+    if cached is not None:
+        return dict(cached)
+    return _remember_user(_get_user_by_email(email))
+
+
+def get_user_by_id(uid: int) -> Optional[Dict[str, Any]]:
+    cached = _USER_CACHE.get(("id", uid))
+    if cached is not None:
+        return dict(cached)
+    return _remember_user(_get_user_by_id(uid))
+
+
+def _get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     con = _conn(); cur = con.cursor()
     p = _ph()
     cur.execute(f"""
@@ -289,7 +579,7 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     return _row_to_user(row)
 
 
-def get_user_by_id(uid: int) -> Optional[Dict[str, Any]]:
+def _get_user_by_id(uid: int) -> Optional[Dict[str, Any]]:
     con = _conn(); cur = con.cursor()
     p = _ph()
     cur.execute(f"""
@@ -300,7 +590,14 @@ def get_user_by_id(uid: int) -> Optional[Dict[str, Any]]:
     return _row_to_user(row)
 
 
-def create_user(email: str, password_hash: str, role: str = "viewer", subscription_active: bool = False) -> Dict[str, Any]:
+_USER_COLUMNS = "id, email, password_hash, role, subscription_active, created_at"
+
+
+def create_user(email: str, password_hash: str, role: str = "viewer", subscription_active: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Insert a user in one round trip. Returns the new user, or None if the
+    email is already taken (UNIQUE(email) conflict) instead of raising.
+    """
     con = _conn(); cur = con.cursor()
     p = _ph()
     # created_at default handled by DB, but we set it explicitly for Postgres portability
@@ -308,17 +605,30 @@ def create_user(email: str, password_hash: str, role: str = "viewer", subscripti
         cur.execute(f"""
             INSERT INTO users (email, password_hash, role, subscription_active, created_at)
             VALUES ({p},{p},{p},{p}, NOW())
-            RETURNING id
+            ON CONFLICT (email) DO NOTHING
+            RETURNING {_USER_COLUMNS}
         """, (email, password_hash, role, subscription_active))
-        new_id = cur.fetchone()["id"]
-    else:
+        row = cur.fetchone()
+    elif _SQLITE_HAS_RETURNING:
         cur.execute(f"""
             INSERT INTO users (email, password_hash, role, subscription_active, created_at)
             VALUES ({p},{p},{p},{p}, datetime('now'))
+            ON CONFLICT (email) DO NOTHING
+            RETURNING {_USER_COLUMNS}
+        """, (email, password_hash, role, 1 if subscription_active else 0))
+        row = cur.fetchone()
+    else:
+        cur.execute(f"""
+            INSERT OR IGNORE INTO users (email, password_hash, role, subscription_active, created_at)
+            VALUES ({p},{p},{p},{p}, datetime('now'))
         """, (email, password_hash, role, 1 if subscription_active else 0))
-        new_id = cur.lastrowid
+        row = None
+        if cur.rowcount:
+            cur.execute(f"SELECT {_USER_COLUMNS} FROM users WHERE id = {p}", (cur.lastrowid,))
+            row = cur.fetchone()
     con.commit(); con.close()
-    return get_user_by_id(int(new_id))
+    _forget_user(email)
+    return _remember_user(_row_to_user(row))
 
 
 def set_subscription_active(email: str, active: bool) -> None:
@@ -327,6 +637,7 @@ def set_subscription_active(email: str, active: bool) -> None:
     value = (True if USING_POSTGRES else (1 if active else 0)) if USING_POSTGRES else (1 if active else 0)
     cur.execute(f"UPDATE users SET subscription_active = {p} WHERE email = {p}", (value, email))
     con.commit(); con.close()
+    _forget_user(email)
 
 
 def set_role(email: str, role: str) -> None:
@@ -334,6 +645,7 @@ def set_role(email: str, role: str) -> None:
     p = _ph()
     cur.execute(f"UPDATE users SET role = {p} WHERE email = {p}", (role, email))
     con.commit(); con.close()
+    _forget_user(email)
 
 
 # --- User Settings API (normalized columns) ----------------------------------
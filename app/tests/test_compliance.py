@@ -23,3 +23,15 @@ def test_internal_transfer():
     tx = T(memo="move funds", from_address="rA", to_address="rB")
     cats = tag_categories(tx, address_book=book)
     assert cats[0].category in {"transfer", "income", "expense"}
+
+def test_tag_category_df_matches_scalar():
+    import pandas as pd
+    from app.compliance import tag_category_df
+    txs = [
+        T(memo="network fee", amount=Decimal("-1"), fee=Decimal("0.1")),
+        T(memo="gasoline purchase", amount=Decimal("-10")),
+        T(memo="salary", amount=Decimal("100"), direction="in"),
+        T(memo="swap then transfer", amount=Decimal("5"), direction=""),
+    ]
+    df = pd.DataFrame([vars(t) for t in txs])
+    assert list(tag_category_df(df)) == [tag_category(t) for t in txs]
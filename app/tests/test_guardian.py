@@ -11,3 +11,40 @@ def test_large_outgoing_risk():
     score, flags = score_risk(tx)
     assert score > 0
     assert "large_outgoing" in flags
+
+def test_score_risk_df_matches_scalar():
+    import pandas as pd
+    from app.guardian import score_risk_df
+    rows = [
+        {"amount": 6000, "fee": 0, "direction": "out", "memo": ""},
+        {"amount": 10, "fee": 1, "direction": "out", "memo": "scam via tornado"},
+        {"amount": 50, "fee": 0, "direction": "in", "memo": "salary"},
+    ]
+    scores, flags = score_risk_df(pd.DataFrame(rows))
+    for i, row in enumerate(rows):
+        score, fl = score_risk(row)
+        assert scores[i] == score
+        assert flags[i] == fl
+
+def test_suspicious_memo_matches_whole_words_only():
+    _, flags = score_risk({"direction": "out", "amount": 1, "memo": "scamper to the park"})
+    assert "suspicious_memo" not in flags
+    _, flags = score_risk({"direction": "out", "amount": 1, "memo": "Possible SCAM via mixer"})
+    assert "suspicious_memo" in flags
+
+def test_score_risk_batch_matches_scalar():
+    from app.guardian import score_risk_batch
+    txs = [
+        Transaction(tx_id="1", amount=6000, direction="out", fee=2),
+        {"amount": "25", "direction": "in", "memo": "ransom", "tags": ["Mixer"]},
+        {"amount": 5, "direction": "out", "is_internal": True},
+    ]
+    scores, flags = score_risk_batch(txs)
+    assert [(float(s), f) for s, f in zip(scores, flags)] == [score_risk(tx) for tx in txs]
+
+def test_flag_bits_round_trip_in_scalar_order():
+    from app.guardian import FLAG_BITS, decode_flags, encode_flags
+    _, flags = score_risk({"direction": "out", "amount": 20000, "fee": 5000, "memo": "scam", "tags": ["mixer"]})
+    assert decode_flags(encode_flags(flags)) == flags
+    assert decode_flags(0) == []
+    assert len(set(FLAG_BITS.values())) == len(FLAG_BITS) and max(FLAG_BITS.values()) < 1 << 16
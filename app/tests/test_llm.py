@@ -0,0 +1,119 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app import llm
+from app.llm import RowsView, apply_filters, filter_rows, summarize_rows
+
+ROWS = [
+    {"tx_id": "1", "timestamp": "2025-01-05T10:00:00", "risk_score": 0.9, "amount": 10, "category": "Scam", "from_addr": "rA", "to_addr": "rB"},
+    {"tx_id": "2", "timestamp": "2025-02-05T10:00:00", "risk_score": "0.2", "amount": "5", "category": "fee", "from_addr": "rB", "to_addr": "rC"},
+    {"tx_id": "3", "timestamp": "2025-03-05T10:00:00", "risk_score": None, "amount": None, "category": None, "from_addr": "rC", "to_addr": "rA"},
+    {"tx_id": "4", "timestamp": "not a date", "risk_score": 0.7, "amount": 1.5, "category": "scam", "from_addr": "rD", "to_addr": "rE"},
+]
+
+def test_apply_filters_spec():
+    ids = lambda out: [r["tx_id"] for r in out]
+    assert ids(apply_filters(ROWS, {"categories": ["SCAM"]})) == ["1", "4"]
+    assert ids(apply_filters(ROWS, {"min_risk": 0.5})) == ["1", "4"]
+    assert ids(apply_filters(ROWS, {"exclude_wallets": ["rA"]})) == ["2", "4"]
+    assert ids(apply_filters(ROWS, {"date_from": "2025-02-01", "max_risk": 1})) == ["2"]
+    assert apply_filters([], {"min_risk": 0.5}) == []
+
+def test_filtered_view_reuses_columns():
+    view = filter_rows(ROWS, {"min_risk": 0.1, "categories": ["scam", "fee"]})
+    assert isinstance(view, RowsView) and len(view) == 3
+    assert [r["tx_id"] for r in view[:2]] == ["1", "2"]
+    assert set(view._cols) >= {"risk_score", "category"}
+    as_view = summarize_rows(view)["kpis"]
+    as_list = summarize_rows(list(view))["kpis"]
+    assert as_view == as_list
+    assert as_view["total_amount"] == 16.5
+
+def test_date_filter_skips_offset_timestamps_mixed_with_naive():
+    rows = [
+        {"tx_id": "a", "timestamp": "2025-03-01T00:00:00+00:00"},
+        {"tx_id": "b", "timestamp": "2025-03-01 00:00:00"},
+        {"tx_id": "c", "timestamp": "2025-01-01T00:00:00"},
+    ]
+    assert [r["tx_id"] for r in apply_filters(rows, {"date_from": "2025-02-01"})] == ["b"]
+
+class _FakeBatchClient:
+    """files/batches stub: `statuses` are returned by create/retrieve in turn."""
+    def __init__(self, statuses, outputs):
+        self.statuses = list(statuses)
+        self.outputs = outputs  # custom_id -> content; None means no output file
+        self.cancelled = []
+        self.files = SimpleNamespace(create=self._upload, content=self._content)
+        self.batches = SimpleNamespace(create=self._next, retrieve=self._next, cancel=self.cancelled.append)
+
+    def with_options(self, **_):
+        return self
+
+    def _upload(self, file, purpose):
+        self.requests = [json.loads(line) for line in file[1].decode().splitlines()]
+        return SimpleNamespace(id="file-in")
+
+    def _next(self, *_, **__):
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return SimpleNamespace(id="batch-1", status=status,
+                               output_file_id="file-out" if self.outputs is not None else None)
+
+    def _content(self, _file_id):
+        lines = [json.dumps({"custom_id": cid, "response": {"body": {"choices": [{"message": {"content": text}}]}}})
+                 for cid, text in self.outputs.items()]
+        return SimpleNamespace(text="\n".join(lines))
+
+def _run_bulk(monkeypatch, client, **kw):
+    monkeypatch.setattr(llm, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(llm, "_sdk", lambda: llm._SDK(True, client, None))
+    monkeypatch.setattr(llm, "_safe_llm", lambda *a, **k: "summary")
+    monkeypatch.setattr(llm.time, "sleep", lambda _s: None)
+    txs = [{"tx_id": "t0", "amount": 1}, {"tx_id": "t1", "amount": 2}]
+    return [it["explanation"].split("\n\n", 1)[1] for it in llm.explain_batch_bulk(txs, **kw)["items"]]
+
+def test_explain_batch_bulk_joins_results_by_custom_id(monkeypatch):
+    client = _FakeBatchClient(["validating", "in_progress", "completed"], {"1": "second", "0": "first"})
+    assert _run_bulk(monkeypatch, client) == ["first", "second"]
+    assert [r["custom_id"] for r in client.requests] == ["0", "1"]
+    assert client.cancelled == []
+
+def test_explain_batch_bulk_failed_and_partial_output(monkeypatch):
+    failed = _run_bulk(monkeypatch, _FakeBatchClient(["failed"], None))
+    assert all("batch batch-1 failed" in text for text in failed)
+    partial = _run_bulk(monkeypatch, _FakeBatchClient(["completed"], {"1": "second"}))
+    assert "no batch result" in partial[0] and partial[1] == "second"
+
+def test_explain_batch_bulk_cancels_on_timeout(monkeypatch):
+    client = _FakeBatchClient(["in_progress"], None)
+    texts = _run_bulk(monkeypatch, client, timeout_seconds=0)
+    assert client.cancelled == ["batch-1"]
+    assert all("timed out (in_progress); cancelled" in text for text in texts)
+
+def test_v1_sdk_calls_go_through_the_pooled_client(monkeypatch):
+    openai = pytest.importorskip("openai")
+    if not hasattr(openai, "OpenAI"):
+        pytest.skip("legacy openai SDK installed")
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.path)
+        return httpx.Response(200, json={
+            "id": "c1", "object": "chat.completion", "created": 0, "model": "m",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": " pooled "}}],
+        })
+
+    monkeypatch.setattr(llm, "OPENAI_API_KEY", "sk-test")
+    llm._sdk.cache_clear()
+    llm.clear_llm_cache()
+    sdk = llm._sdk()
+    assert sdk.use_v1 and len(sdk.pools) == 2
+    sdk.pools[0]._transport = httpx.MockTransport(handler)
+    assert llm._safe_llm("sys", "pooled-client test") == "pooled"
+    assert seen == ["/v1/chat/completions"]
+    asyncio.run(llm.aclose())
+    assert all(p.is_closed for p in sdk.pools) and llm._sdk.cache_info().currsize == 0
@@ -0,0 +1,146 @@
+import pytest
+
+from app import store
+
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, "DB_PATH", str(tmp_path / "test.db"))
+    store._USER_CACHE.clear()
+    store.init_db()
+    return store
+
+
+def _tx(i, **kw):
+    d = {
+        "tx_id": f"tx{i}", "timestamp": "2025-08-01T12:00:00", "chain": "XRP",
+        "from_addr": "rAlice", "to_addr": "rBob", "amount": 10.0 * i, "symbol": "XRP",
+        "direction": "out", "memo": "", "fee": 0.0, "category": "expense",
+        "risk_score": 0.2, "risk_flags": ["outgoing"], "notes": "",
+    }
+    d.update(kw)
+    return d
+
+
+def test_save_tagged_many_inserts_all_rows(db):
+    assert db.save_tagged_many([]) == 0
+    assert db.save_tagged_many(_tx(i) for i in range(1, 6)) == 5
+    rows = db.list_all(limit=10)
+    assert len(rows) == 5
+    assert rows[0]["risk_flags"] == ["outgoing"]
+
+def test_save_tagged_many_is_all_or_nothing(db):
+    with pytest.raises(Exception):
+        db.save_tagged_many([_tx(1), _tx(2, memo={"not": "bindable"})])
+    assert db.list_all(limit=10) == []
+    db.save_tagged(_tx(3))
+    assert [r["tx_id"] for r in db.list_all(limit=10)] == ["tx3"]
+
+
+def test_stats_aggregates_in_sql(db):
+    db.save_tagged_many([
+        _tx(1, risk_score=0.9, category="fee"),
+        _tx(2, risk_score=0.1, category=""),
+        _tx(3, risk_score=0.5, category="fee"),
+    ])
+    s = db.stats(threshold=0.75)
+    assert s["total"] == 3
+    assert s["alerts"] == 1
+    assert abs(s["avg_risk"] - 0.5) < 1e-9
+    assert s["categories"] == {"fee": 2, "unknown": 1}
+
+
+def test_metrics_groups_by_day_in_sql(db):
+    db.save_tagged_many([
+        _tx(1, risk_score=0.9, category="fee", timestamp="2025-08-01 09:00:00"),
+        _tx(2, risk_score=0.1, category=None, timestamp="2025-08-01T23:59:59"),
+        _tx(3, risk_score=0.5, category="fee", timestamp="2025-08-03T08:00:00.123456"),
+        _tx(4, risk_score=0.4, category="income", timestamp="not a date"),
+    ])
+    m = db.metrics(threshold=0.75)
+    assert (m["total"], m["alerts"]) == (4, 1)
+    assert abs(m["avg_risk"] - 0.475) < 1e-9
+    assert list(m["categories"].items()) == [("fee", 2), ("income", 1), ("unknown", 1)]
+    assert [(d["date"], d["low"], d["medium"], d["high"]) for d in m["series_by_day"]] == [
+        ("2025-08-01", 1, 0, 1), ("2025-08-03", 0, 1, 0),
+    ]
+    assert abs(m["series_by_day"][0]["avg_risk"] - 0.5) < 1e-9
+    recent = db.metrics(since="2025-08-02T00:00:00")
+    assert recent["total"] == 1 and recent["categories"] == {"fee": 1}
+    assert db.metrics(limit=1)["total"] == 1
+
+
+def test_connection_rolls_back_on_error(db):
+    db.save_tagged_many([_tx(1)])
+    with pytest.raises(RuntimeError):
+        with db.connection() as con:
+            con.cursor().execute("DELETE FROM txs")
+            raise RuntimeError("boom")
+    assert db.stats()["total"] == 1
+
+
+def test_user_cache_invalidated_on_write(db):
+    u = db.create_user("a@example.com", "hash")
+    assert db.get_user_by_email("a@example.com")["role"] == "viewer"
+    db.set_role("a@example.com", "analyst")
+    assert db.get_user_by_email("a@example.com")["role"] == "analyst"
+    assert db.get_user_by_id(u["id"])["role"] == "analyst"
+    db.get_user_by_id(u["id"])["role"] = "mutated"
+    assert db.get_user_by_id(u["id"])["role"] == "analyst"
+
+
+def test_create_user_returns_none_on_duplicate_email(db):
+    assert db.create_user("dup@example.com", "h1")["email"] == "dup@example.com"
+    assert db.create_user("dup@example.com", "h2") is None
+    assert db.users_count() == 1
+
+
+def test_query_pushes_spec_into_sql(db):
+    db.save_tagged_many([
+        _tx(1, risk_score=0.9, category="Scam", from_addr="rEve"),
+        _tx(2, risk_score=0.1, category="fee"),
+        _tx(3, risk_score=0.8, category="scam", timestamp="2025-07-01T00:00:00"),
+        _tx(4, risk_score=0.95, category=None, to_addr=None),
+    ])
+    ids = lambda rows: [r["tx_id"] for r in rows]
+    assert ids(db.query({})) == ["tx4", "tx3", "tx2", "tx1"]
+    assert ids(db.query({"categories": ["SCAM"], "min_risk": 0.5})) == ["tx3", "tx1"]
+    assert ids(db.query({"exclude_wallets": ["rEve", "None"]})) == ["tx3", "tx2"]
+    assert ids(db.query({"include_wallets": ["rEve"]})) == ["tx1"]
+    # day-granular with a day of slack: exact bounds are left to apply_filters
+    assert ids(db.query({"date_from": "2025-07-31T18:00:00"})) == ["tx4", "tx2", "tx1"]
+    assert ids(db.query({"date_to": "2025-07-02"})) == ["tx3"]
+    assert ids(db.query({"min_risk": 0.5}, limit=2)) == ["tx4", "tx3"]
+
+def test_iter_rows_batches_match_list_queries(db):
+    db.save_tagged_many(_tx(i, from_addr="rCarol" if i % 3 == 0 else "rAlice") for i in range(1, 8))
+    batches = list(db.iter_rows(limit=6, batch_size=4))
+    assert [len(b) for b in batches] == [4, 2]
+    assert [r for b in batches for r in b] == db.list_all(limit=6)
+    flat = [r for b in db.iter_rows("rCarol", limit=10, batch_size=1) for r in b]
+    assert flat == db.list_by_wallet("rCarol", limit=10)
+    assert list(db.iter_rows("nobody")) == []
+
+def test_seed_demo_coerces_bad_numbers(db, tmp_path):
+    from app.admin import _seed_demo
+    path = tmp_path / "seed.csv"
+    path.write_text(
+        "tx_id,timestamp,amount,fee,memo\n"
+        "s1,2025-08-01T12:00:00,x,0.1,\n"
+        "s2,2025-08-02T12:00:00,5,,gift\n"
+    )
+    assert _seed_demo(str(path), None) == 2
+    rows = {r["tx_id"]: r for r in db.list_all(limit=10)}
+    assert (rows["s1"]["amount"], rows["s1"]["fee"]) == (0.0, 0.1)
+    assert (rows["s2"]["amount"], rows["s2"]["fee"]) == (5.0, 0.0)
+
+def test_seed_demo_timestamp_optional_and_nat_is_null(db, tmp_path):
+    from app.admin import _seed_demo
+    no_ts = tmp_path / "no_ts.csv"
+    no_ts.write_text("tx_id,amount\nn1,1\n")
+    bad_ts = tmp_path / "bad_ts.csv"
+    bad_ts.write_text("tx_id,timestamp,amount\nb1,not a date,1\nb2,2025-08-01 12:00:00,2\n")
+    assert _seed_demo(str(no_ts), None) == 1
+    assert _seed_demo(str(bad_ts), None) == 2
+    ts = {r["tx_id"]: r["timestamp"] for r in db.list_all(limit=10)}
+    assert ts == {"n1": None, "b1": None, "b2": "2025-08-01T12:00:00"}